@@ -39,6 +39,7 @@ class Track(commands.AutoShardedBot):
         self.uptime = datetime.utcnow()
         self.created_on = datetime.fromtimestamp(config.created_on)
         self.color = config.color  # color used to theme embeds
+        self.replay_worker = utils.ReplayWorker()  # shared by replay commands
 
     async def get_prefix(self, message):
         prefixes = {f'<@!{self.user.id}> ', f'<@{self.user.id}> '}  # Nicknamed mention and normal mention, respectively
@@ -66,6 +67,7 @@ class Track(commands.AutoShardedBot):
             await conn.execute('INSERT INTO stats VALUES (?, ?)',
                                (int(time.time()), pickle.dumps(self.stats)))
 
+        self.replay_worker.shutdown()
         await super().logout()
 
 
@@ -32,7 +32,7 @@ import os
 
 import config
 import utils
-from replay_unpack.clients.wows import ReplayPlayer
+from replay_unpack.clients.wows.helper import is_supported_version
 
 
 Tier = int
@@ -143,7 +143,10 @@ MAPLESYRUP_MAPPING = {'battles': ('total battles', 'total battles'),
                       'damage': ('average of rates', 'damagecaused')}
 HISTDATA_CHANNEL = config.histdata_channel_id
 TL_GRIDS = 10
-TL_SAMPLE_RATE = 0.5
+TL_SAMPLE_RATE = 0.5  # game seconds between frames
+TL_FPS = 30
+TL_CACHE_PATH = 'assets/private/replays.db'
+TL_CACHE_SIZE = 512 * 1024 * 1024  # bytes
 TL_COLORS = {'ally': (70, 224, 163), 'enemy': (248, 64, 0),
              'teamkiller': (252, 130, 180), 'division': (252, 202, 101)}
 TL_CAP_COLORS = {'neutral': ((255, 255, 255, 170), (255, 255, 255, 30)),
@@ -973,6 +976,8 @@ class WoWS(commands.Cog, name='Wows'):
                                           'id': params['id'],
                                           'typeinfo': params['typeinfo']})
 
+        self.replay_cache = utils.ReplayCache(TL_CACHE_PATH, TL_CACHE_SIZE)
+
         self.bot.ms_ships = {}
         with sqlite3.connect('assets/private/maplesyrup.db') as conn:
             c = conn.execute('SELECT name FROM sqlite_master WHERE type=\'table\'')
@@ -1682,21 +1687,39 @@ class WoWS(commands.Cog, name='Wows'):
             fp = io.BytesIO()
             await ctx.message.attachments[0].save(fp)
             reader = utils.ReplayReader(fp)
-            data = await self.bot.loop.run_in_executor(ThreadPoolExecutor(), reader.get_data)
-            version = data.engine_data['clientVersionFromExe']
+
+            # only the JSON header is parsed here, so bad uploads are refused before decryption
+            header = reader.get_header()
+            version = header.engine_data['clientVersionFromExe']
+            version = version[:version.rfind(',')].replace(',', '_')
+            map_name = header.engine_data['mapName']
+            if not is_supported_version(version):
+                return await ctx.send(f'version {version} is not supported currently. PM owner if bot is outdated.')
+            elif not os.path.exists(f'assets/private/{map_name}/space.settings'):
+                return await ctx.send(f'Map {map_name} is not supported currently. PM owner if bot is outdated.')
+            elif not header.engine_data.get('vehicles'):
+                return await ctx.send('Replay has no players.')
+
+            cache_key, info = await self.bot.loop.run_in_executor(None, self.replay_cache.lookup, fp.getvalue())
             await ctx.send('Replay parsed.')
 
-        async with ctx.typing():
-            try:
-                replay_player = ReplayPlayer(version[:version.rfind(',')].replace(',', '_'))
-            except RuntimeError as e:
-                return await ctx.send(f'{e}. PM owner if bot is outdated.')
-            await self.bot.loop.run_in_executor(ThreadPoolExecutor(), replay_player.play, data.decrypted_data)
-            info = replay_player.get_info()
-            await ctx.send('Encrypted data processed. Building video...')
-
-        map_name = data.engine_data['mapName']
-        minimap = await self.bot.loop.run_in_executor(ThreadPoolExecutor(), self.create_minimap, map_name)
+        if info is None:
+            async with ctx.typing():
+                try:
+                    info = await self.bot.replay_worker.parse(fp.getvalue(), version)
+                except RuntimeError as e:
+                    return await ctx.send(f'{e}. PM owner if bot is outdated.')
+                except utils.CustomError:
+                    # queue full or timeout, message is sent by error handler
+                    raise
+                except Exception:
+                    # e.g. truncated or corrupted replay, failure comes from worker process
+                    logging.exception('Failed to parse replay %s', ctx.message.attachments[0].filename)
+                    return await ctx.send('Replay could not be parsed, it may be corrupted or incomplete.')
+                await self.bot.loop.run_in_executor(None, self.replay_cache.put, cache_key, info)
+                await ctx.send('Encrypted data processed. Building video...')
+
+        minimap = await self.bot.loop.run_in_executor(None, self.create_minimap, map_name)
         width, height = self.get_map_dimensions(map_name)
 
        # plane_types = []
@@ -1721,9 +1744,11 @@ class WoWS(commands.Cog, name='Wows'):
                     4 if player_info.isOwner else
                     2 + player_info.isAlly)
 
+        caps_cursor = info['caps_history'].cursor()
+
         def create_frame(time, states):
             base = minimap.copy()
-            base = self.draw_caps(width, height, info['owner_team_id'], base, info['caps_history'][time])
+            base = self.draw_caps(width, height, info['owner_team_id'], base, caps_cursor.seek(time))
             base_draw = ImageDraw.Draw(base)
             states.sort(key=draw_priority)
 
@@ -1758,11 +1783,25 @@ class WoWS(commands.Cog, name='Wows'):
             del base_draw
             return numpy.array(base)
 
+        def sample_frames():
+            # frames are sampled from recorded changes, so rate does not depend on parsing,
+            # arange stops before battle end, so last frame is added explicitly
+            battle_times = list(info['caps_history'])
+            if not battle_times:
+                return None
+            frame_times = numpy.append(numpy.arange(battle_times[0], battle_times[-1], TL_SAMPLE_RATE),
+                                       battle_times[-1])
+            return info['player_events'].sample(frame_times)
+
+        sampled_states = await self.bot.loop.run_in_executor(None, sample_frames)
+        if not sampled_states:
+            raise utils.CustomError('Replay has no battle time to show.')
+
         with imageio.get_writer(f'assets/temp/{ctx.message.id}.mp4', output_params=['-crf', '10'],
-                                fps=30, **{'macro_block_size': None}) as writer:
-            for time, player_states in info['timedPlayerStates'].items():
+                                fps=TL_FPS, **{'macro_block_size': None}) as writer:
+            for time, player_states in sampled_states.items():
                 # print(info['caps_history'][time])
-                writer.append_data(await self.bot.loop.run_in_executor(ThreadPoolExecutor(), create_frame, time, player_states))
+                writer.append_data(await self.bot.loop.run_in_executor(None, create_frame, time, player_states))
         dfname = rchop(ctx.message.attachments[0].filename,".wowsreplay")
         await ctx.send(file=discord.File(f'assets/temp/{ctx.message.id}.mp4', filename=(f'{dfname}.mp4')))
         os.remove(f'assets/temp/{ctx.message.id}.mp4')
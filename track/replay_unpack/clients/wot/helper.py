@@ -11,7 +11,7 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
 
 def get_definitions(version):
-    return Definitions(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
+    return Definitions.load(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
 
 
 def get_controller(version):
@@ -6,6 +6,7 @@ from replay_unpack.core import (
     Entity
 )
 from replay_unpack.core.network.player import ControlledPlayerBase
+from replay_unpack.core.packets import NestedPathCache
 from .helper import get_definitions, get_controller
 from .network.packets import (
     Map,
@@ -24,6 +25,10 @@ from .network.packets import (
 
 class ReplayPlayer(ControlledPlayerBase):
 
+    def __init__(self, version: str):
+        super(ReplayPlayer, self).__init__(version)
+        self._nested_paths = NestedPathCache()
+
     def _get_definitions(self, version):
         return get_definitions(version)
 
@@ -45,7 +50,8 @@ class ReplayPlayer(ControlledPlayerBase):
                 base_player = self._battle_controller.entities[packet.entityId]
             else:
                 base_player = Entity(id_=packet.entityId,
-                                     spec=self._definitions.get_entity_def_by_name('Avatar'))
+                                     spec=self._definitions.get_entity_def_by_name('Avatar'),
+                                     subscriptions=self._battle_controller.subscriptions)
 
             # base is internal, so props are stored in order of xml file
             # io = BytesIO(packet.value.value)
@@ -61,7 +67,8 @@ class ReplayPlayer(ControlledPlayerBase):
                 cell_player = self._battle_controller.entities[packet.entityId]
             else:
                 cell_player = Entity(id_=packet.entityId,
-                                     spec=self._definitions.get_entity_def_by_name('Avatar'))
+                                     spec=self._definitions.get_entity_def_by_name('Avatar'),
+                                     subscriptions=self._battle_controller.subscriptions)
 
             # cell is internal, so props are stored in order of xml file
             io = packet.value.io()
@@ -72,15 +79,16 @@ class ReplayPlayer(ControlledPlayerBase):
             self._battle_controller.create_entity(cell_player)
 
         elif isinstance(packet, EntityEnter):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = True
+            self._battle_controller.entities[packet.entityId].is_on_aoi = True
 
         elif isinstance(packet, EntityLeave):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = False
+            self._battle_controller.entities[packet.entityId].is_on_aoi = False
 
         elif isinstance(packet, EntityCreate):
             entity = Entity(
                 id_=packet.entityID,
-                spec=self._definitions.get_entity_def_by_index(packet.type))
+                spec=self._definitions.get_entity_def_by_index(packet.type),
+                subscriptions=self._battle_controller.subscriptions)
 
             values = packet.state.io()
             values_count, = struct.unpack('B', values.read(1))
@@ -111,4 +119,4 @@ class ReplayPlayer(ControlledPlayerBase):
             logging.debug('')
             logging.debug('nested property request for id=%s isSlice=%s packet=%s',
                           e.id, packet.is_slice, packet.payload.hex())
-            packet.read_and_apply(e)
+            packet.read_and_apply(e, self._nested_paths)
@@ -1,19 +1,24 @@
 # coding=utf-8
 
+from typing import Dict
+
 from replay_unpack.core import IBattleController
-from replay_unpack.core.entity import Entity
+from replay_unpack.core.entity import Entity, Subscriptions
 
 
 class BattleController(IBattleController):
 
     def __init__(self):
         self._entities = {}
+        # entities by type name in creation order, so that lookups by type do not scan all entities
+        self._entities_by_name: Dict[str, Dict[int, Entity]] = {}
 
         self._map = None
         self._player_id = None
         self._tracerts = []
+        self.subscriptions = Subscriptions()
         # just for test
-        Entity.subscribe_method_call('Avatar', 'showTracer', lambda *args: self._tracerts.append(args[1:]))
+        self.subscriptions.subscribe_method_call('Avatar', 'showTracer', lambda *args: self._tracerts.append(args[1:]))
 
     @property
     def entities(self):
@@ -21,13 +26,18 @@ class BattleController(IBattleController):
 
     @property
     def battle_logic(self):
-        return next(e for e in self._entities.values() if e.get_name() == 'BattleLogic')
+        return next(iter(self._entities_by_name.get('BattleLogic', {}).values()))
 
     def create_entity(self, entity: Entity):
+        previous = self._entities.get(entity.id)
+        if previous is not None:
+            self._entities_by_name[previous.get_name()].pop(entity.id)
         self._entities[entity.id] = entity
+        self._entities_by_name.setdefault(entity.get_name(), {})[entity.id] = entity
 
     def destroy_entity(self, entity: Entity):
         self._entities.pop(entity.id)
+        self._entities_by_name[entity.get_name()].pop(entity.id)
 
     def on_player_enter_world(self, entity_id: int):
         self._player_id = entity_id
@@ -4,20 +4,44 @@ __author__ = "Aleksandr Shyshatsky"
 
 import importlib
 import os
+import re
 
 from replay_unpack.core.entity_def.definitions import Definitions
+from replay_unpack.core.entity_def.scripts_store import MANIFEST_FILE_NAME, SCRIPTS_DIR_NAME
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+# e.g. 0_10_1, anything else in versions directory is not a game version
+VERSION_PATTERN = re.compile(r'^\d+(_\d+)+$')
 
 
 def get_definitions(version):
-    return Definitions(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
+    return Definitions.load(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
+
+
+def is_supported_version(version):
+    """
+    Check that battle controller and definitions for given version exist,
+    without parsing them or creating a controller.
+    Version usually comes from replay header, so it is validated first.
+    """
+    version = version.replace('.', '_')
+    if not VERSION_PATTERN.match(version):
+        return False
+
+    version_dir = os.path.join(BASE_DIR, 'versions', version)
+    return (os.path.isfile(os.path.join(version_dir, '__init__.py')) and
+            os.path.isfile(os.path.join(version_dir, 'battle_controller.py')) and
+            (os.path.isfile(os.path.join(version_dir, MANIFEST_FILE_NAME)) or
+             os.path.isdir(os.path.join(version_dir, SCRIPTS_DIR_NAME))))
 
 
 def get_controller(version):
     """
     Get real controller class by game version.
     """
+    if not is_supported_version(version):
+        raise RuntimeError("version %s is not supported currently" % version)
+
     try:
         module = importlib.import_module('.versions.%s' % version, package=__package__)
     except ModuleNotFoundError:
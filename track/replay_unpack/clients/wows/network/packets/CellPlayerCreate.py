@@ -5,13 +5,14 @@ from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import BinaryStream
 from replay_unpack.core.network.types import Vector3
 
+CELL_PLAYER_CREATE = struct.Struct('=3i3f3f')
+
 
 class CellPlayerCreate(PrettyPrintObjectMixin):
     def __init__(self, stream):
-        self.entityId, = struct.unpack('i', stream.read(4))
-        self.spaceId, = struct.unpack('i', stream.read(4))
-        self.vehicleId, = struct.unpack('i', stream.read(4))
-        self.position = Vector3(stream)
-        self.direction = Vector3(stream)
+        (self.entityId, self.spaceId, self.vehicleId,
+         x, y, z, dx, dy, dz) = stream.unpack(CELL_PLAYER_CREATE)
+        self.position = Vector3.from_values(x, y, z)
+        self.direction = Vector3.from_values(dx, dy, dz)
 
         self.value = BinaryStream(stream)
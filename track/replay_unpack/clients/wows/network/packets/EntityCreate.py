@@ -5,14 +5,14 @@ from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import BinaryStream
 from replay_unpack.core.network.types import Vector3
 
+ENTITY_CREATE = struct.Struct('=ihii3f3f')
+
 
 class EntityCreate(PrettyPrintObjectMixin):
     def __init__(self, stream):
-        self.entityID, = struct.unpack('i', stream.read(4))
-        self.type, = struct.unpack('h', stream.read(2))
-        self.vehicleId, = struct.unpack('i', stream.read(4))
-        self.spaceId, = struct.unpack('i', stream.read(4))
-        self.position = Vector3(stream)
-        self.direction = Vector3(stream)
+        (self.entityID, self.type, self.vehicleId, self.spaceId,
+         x, y, z, dx, dy, dz) = stream.unpack(ENTITY_CREATE)
+        self.position = Vector3.from_values(x, y, z)
+        self.direction = Vector3.from_values(dx, dy, dz)
 
         self.state = BinaryStream(stream)
@@ -1,14 +1,15 @@
 # coding=utf-8
 import logging
 import struct
-from io import BytesIO
 
 from replay_unpack.core import (
     Entity
 )
 from replay_unpack.core.network.player import ControlledPlayerBase
+from replay_unpack.core.packets import NestedPathCache
 from .helper import get_definitions, get_controller
 from .network.packets import (
+    EntityControl,
     Map,
     BasePlayerCreate,
     CellPlayerCreate,
@@ -22,9 +23,22 @@ from .network.packets import (
     PACKETS_MAPPING
 )
 
+METHOD_HEADER = struct.Struct('II')
+
 
 class ReplayPlayer(ControlledPlayerBase):
 
+    def __init__(self, version: str):
+        super(ReplayPlayer, self).__init__(version)
+
+        # packet classes that don't change controller state
+        skipped = {EntityControl}
+        if not self._battle_controller.needs_positions:
+            skipped.add(Position)
+        self._needed_types = {type_ for type_, cls in self._mapping.items() if cls not in skipped}
+        self._method_types = {type_ for type_, cls in self._mapping.items() if cls is EntityMethod}
+        self._nested_paths = NestedPathCache()
+
     def _get_definitions(self, version):
         # try:
         #     return get_definitions('_'.join(version[:4]))
@@ -42,6 +56,20 @@ class ReplayPlayer(ControlledPlayerBase):
     def _get_packets_mapping(self):
         return PACKETS_MAPPING
 
+    def _is_packet_needed(self, packet):
+        if packet.type not in self._needed_types:
+            return False
+
+        if packet.type in self._method_types:
+            # peek at entity and method ids, so that methods
+            # nobody subscribed to are never deserialized
+            entity_id, message_id = packet.raw_data.unpack(METHOD_HEADER)
+            packet.raw_data.seek(0)
+            entity = self._battle_controller.entities.get(entity_id)
+            if entity is not None:
+                return entity.has_method_subscriptions(message_id)
+        return True
+
     def _process_packet(self, packet, time):
 
         self._battle_controller.update(time)
@@ -56,10 +84,11 @@ class ReplayPlayer(ControlledPlayerBase):
                 base_player = self._battle_controller.entities[packet.entityId]
             else:
                 base_player = Entity(id_=packet.entityId,
-                                     spec=self._definitions.get_entity_def_by_name('Avatar'))
+                                     spec=self._definitions.get_entity_def_by_name('Avatar'),
+                                     subscriptions=self._battle_controller.subscriptions)
 
             # base is internal, so props are stored in order of xml file
-            io = BytesIO(packet.value.value)
+            io = packet.value.io()
             for index, prop in enumerate(base_player.base_properties):
                 base_player.set_base_property(index, io)
 
@@ -72,7 +101,8 @@ class ReplayPlayer(ControlledPlayerBase):
                 cell_player = self._battle_controller.entities[packet.entityId]
             else:
                 cell_player = Entity(id_=packet.entityId,
-                                     spec=self._definitions.get_entity_def_by_name('Avatar'))
+                                     spec=self._definitions.get_entity_def_by_name('Avatar'),
+                                     subscriptions=self._battle_controller.subscriptions)
 
             # cell is internal, so props are stored in order of xml file
             io = packet.value.io()
@@ -83,15 +113,16 @@ class ReplayPlayer(ControlledPlayerBase):
             self._battle_controller.create_entity(cell_player)
 
         elif isinstance(packet, EntityEnter):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = True
+            self._battle_controller.entities[packet.entityId].is_on_aoi = True
 
         elif isinstance(packet, EntityLeave):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = False
+            self._battle_controller.entities[packet.entityId].is_on_aoi = False
 
         elif isinstance(packet, EntityCreate):
             entity = Entity(
                 id_=packet.entityID,
-                spec=self._definitions.get_entity_def_by_index(packet.type))
+                spec=self._definitions.get_entity_def_by_index(packet.type),
+                subscriptions=self._battle_controller.subscriptions)
 
             values = packet.state.io()
             values_count, = struct.unpack('B', values.read(1))
@@ -122,4 +153,4 @@ class ReplayPlayer(ControlledPlayerBase):
             logging.debug('')
             logging.debug('nested property request for id=%s isSlice=%s packet=%s',
                           e.id, packet.is_slice, packet.payload.hex())
-            packet.read_and_apply(e)
+            packet.read_and_apply(e, self._nested_paths)
@@ -1,14 +1,16 @@
 # coding=utf-8
 import logging
 import pickle
+from functools import lru_cache
 
-from typing import List, Dict
-from copy import deepcopy
+from typing import Dict, List
 
-from replaydata import PlayerInfo, PlayerState
+import numpy
+
+from replaydata import CapsHistory, PlayerInfo, PlayerStateEvents
 
 from replay_unpack.core import IBattleController
-from replay_unpack.core.entity import Entity
+from replay_unpack.core.entity import Entity, Subscriptions
 from .constants import DamageStatsType, Category, TaskType, Status
 
 try:
@@ -19,9 +21,13 @@ from .players_info import PlayersInfo
 
 
 class BattleController(IBattleController):
+    # player states come from minimap vision, not entity positions
+    needs_positions = False
 
     def __init__(self):
         self._entities = {}
+        # entities by type name in creation order, so that lookups by type do not scan all entities
+        self._entities_by_name: Dict[str, Dict[int, Entity]] = {}
         self._achievements = {}
         self._ribbons = {}
         self._players = PlayersInfo()
@@ -39,26 +45,29 @@ class BattleController(IBattleController):
         self._previous_time = 0
         self._interval = 0.5
         self._playerInfo: List[PlayerInfo] = []
-        self._playerStates: List[PlayerState] = []
-        self._timedPlayerStates: Dict[int, List[PlayerState]] = {}
-        self._caps_history = {}
+        # changes of player states, consumers sample them at times they need
+        self._player_events = PlayerStateEvents()
+        # slots of players in _player_events by vehicle id, usually there is one
+        self._vehicle_slots: Dict[int, List[int]] = {}
+        self._caps_history = CapsHistory()
         self.owner_team_id = 0
         ################################################################################################################
 
-        Entity.subscribe_method_call('Avatar', 'onBattleEnd', self.onBattleEnd)
-        Entity.subscribe_method_call('Avatar', 'onArenaStateReceived', self.onArenaStateReceived)
-        Entity.subscribe_method_call('Avatar', 'onGameRoomStateChanged', self.onPlayerInfoUpdate)
-        Entity.subscribe_method_call('Avatar', 'receiveVehicleDeath', self.receiveVehicleDeath)
-        # Entity.subscribe_method_call('Vehicle', 'setConsumables', self.onSetConsumable)
-        Entity.subscribe_method_call('Avatar', 'onRibbon', self.onRibbon)
-        Entity.subscribe_method_call('Avatar', 'onAchievementEarned', self.onAchievementEarned)
-        Entity.subscribe_method_call('Avatar', 'receiveDamageStat', self.receiveDamageStat)
-        Entity.subscribe_method_call('Avatar', 'receive_planeDeath', self.receive_planeDeath)
-        Entity.subscribe_method_call('Avatar', 'onNewPlayerSpawnedInBattle', self.onNewPlayerSpawnedInBattle)
-        Entity.subscribe_method_call('Vehicle', 'receiveDamagesOnShip', self.g_receiveDamagesOnShip)
-        Entity.subscribe_method_call('Avatar', 'updateMinimapVisionInfo', self.updateMinimapVisionInfo)
-        Entity.subscribe_property_change('Vehicle', 'health', self.setHealth)
-        #Entity.subscribe_method_call('Avatar', 'receive_addMinimapSquadron', self.receive_addMinimapSquadron)
+        self.subscriptions = Subscriptions()
+        self.subscriptions.subscribe_method_call('Avatar', 'onBattleEnd', self.onBattleEnd)
+        self.subscriptions.subscribe_method_call('Avatar', 'onArenaStateReceived', self.onArenaStateReceived, lazy=True)
+        self.subscriptions.subscribe_method_call('Avatar', 'onGameRoomStateChanged', self.onPlayerInfoUpdate, lazy=True)
+        self.subscriptions.subscribe_method_call('Avatar', 'receiveVehicleDeath', self.receiveVehicleDeath)
+        # self.subscriptions.subscribe_method_call('Vehicle', 'setConsumables', self.onSetConsumable)
+        self.subscriptions.subscribe_method_call('Avatar', 'onRibbon', self.onRibbon)
+        self.subscriptions.subscribe_method_call('Avatar', 'onAchievementEarned', self.onAchievementEarned)
+        self.subscriptions.subscribe_method_call('Avatar', 'receiveDamageStat', self.receiveDamageStat)
+        self.subscriptions.subscribe_method_call('Avatar', 'receive_planeDeath', self.receive_planeDeath)
+        self.subscriptions.subscribe_method_call('Avatar', 'onNewPlayerSpawnedInBattle', self.onNewPlayerSpawnedInBattle)
+        self.subscriptions.subscribe_method_call('Vehicle', 'receiveDamagesOnShip', self.g_receiveDamagesOnShip)
+        self.subscriptions.subscribe_method_call('Avatar', 'updateMinimapVisionInfo', self.updateMinimapVisionInfo)
+        self.subscriptions.subscribe_property_change('Vehicle', 'health', self.setHealth)
+        #self.subscriptions.subscribe_method_call('Avatar', 'receive_addMinimapSquadron', self.receive_addMinimapSquadron)
 
     ####################################################################################################################
 
@@ -66,10 +75,8 @@ class BattleController(IBattleController):
         self._time = time
         if time - self._previous_time >= self._interval:
             self._previous_time = time
-            self._timedPlayerStates[time] = deepcopy(self._playerStates)
 
-            caps = self._getCapturePointsInfo()
-            self._caps_history[time] = deepcopy(caps)
+            self._caps_history.record(time, self._getCapturePointsInfo())
             # print(caps)
             # print(str(time) + ': ' + str([cap['teamId'] for cap in caps]))
 
@@ -91,39 +98,40 @@ class BattleController(IBattleController):
                 self.owner_team_id = player['teamId']
             self._playerInfo.append(pi)
 
-            ps = PlayerState()
-            ps.id = player['id']
-            ps.avatarId = player['avatarId']
-            ps.vehicleId = player['shipId']
-            self._playerStates.append(ps)
+            slot = self._player_events.add_player(self._time, player['id'], player['avatarId'], player['shipId'])
+            self._vehicle_slots.setdefault(player['shipId'], []).append(slot)
 
         for pi in self._playerInfo:
             pi.isAlly = self.owner_team_id == pi.teamId
 
     def update_player_state_list(self):
-        for ps in self._playerStates:
-            player = self._players.get_info()[ps.id]
-            ps.isAlive = player['isAlive']
-            ps.isAbuser = player['isAbuser']
+        for slot in range(self._player_events.get_players_count()):
+            player = self._players.get_info()[self._player_events.get_id(slot)]
+            self._player_events.set_value(self._time, slot, 'isAlive', player['isAlive'])
+            self._player_events.set_value(self._time, slot, 'isAbuser', player['isAbuser'])
 
     def updateMinimapVisionInfo(self, avatar, ships_minimap_diff, buildings_minimap_diff):
-        pack_pattern = (
-            (-2500.0, 2500.0, 11),
-            (-2500.0, 2500.0, 11),
-            (-3.141592753589793, 3.141592753589793, 9)
-        )
+        slots = []
+        packed_data = []
         for e in ships_minimap_diff:
-            vehicle_id = e['vehicleID']
-            x, y, yaw = unpack_values(e['packedData'], pack_pattern)
-            for ps in self._playerStates:
-                if vehicle_id == ps.vehicleId:
-                    ps.setPosition(x, y, yaw)
-                    break
+            vehicle_slots = self._vehicle_slots.get(e['vehicleID'])
+            if vehicle_slots:
+                # position is applied to first matching player only
+                slots.append(vehicle_slots[0])
+                packed_data.append(e['packedData'])
+
+        if len(slots) < MINIMAP_BATCH_SIZE:
+            # NumPy call overhead outweighs few entries
+            for slot, packed in zip(slots, packed_data):
+                self._player_events.set_position(self._time, slot, *unpack_values(packed, MINIMAP_PACK_PATTERN))
+            return
+
+        values = unpack_values_array(numpy.array(packed_data, dtype=numpy.int64), MINIMAP_PACK_PATTERN)
+        self._player_events.set_positions(self._time, slots, values[:, 0], values[:, 1], values[:, 2])
 
     def setHealth(self, vehicle, health):
-        for ps in self._playerStates:
-            if vehicle.id == ps.vehicleId:
-                ps.health = health
+        for slot in self._vehicle_slots.get(vehicle.id, ()):
+            self._player_events.set_value(self._time, slot, 'health', health)
 
     # def receive_addMinimapSquadron(self, avatar, plane_id, int, gameparams_id, pos):
     #     packed = bin(plane_id)[2:]
@@ -144,13 +152,18 @@ class BattleController(IBattleController):
 
     @property
     def battle_logic(self):
-        return next(e for e in self._entities.values() if e.get_name() == 'BattleLogic')
+        return next(iter(self._entities_by_name.get('BattleLogic', {}).values()))
 
     def create_entity(self, entity: Entity):
+        previous = self._entities.get(entity.id)
+        if previous is not None:
+            self._entities_by_name[previous.get_name()].pop(entity.id)
         self._entities[entity.id] = entity
+        self._entities_by_name.setdefault(entity.get_name(), {})[entity.id] = entity
 
     def destroy_entity(self, entity: Entity):
         self._entities.pop(entity.id)
+        self._entities_by_name[entity.get_name()].pop(entity.id)
 
     def on_player_enter_world(self, entity_id: int):
         self._player_id = entity_id
@@ -158,7 +171,7 @@ class BattleController(IBattleController):
     def get_info(self):
         return dict(
             playerInfo=self._playerInfo,
-            timedPlayerStates=self._timedPlayerStates,
+            player_events=self._player_events,
             owner_team_id=self.owner_team_id,
             caps_history=self._caps_history,
             achievements=self._achievements,
@@ -223,9 +236,8 @@ class BattleController(IBattleController):
             skill_id += 1
 
     def _getCrewSkillsInfo(self):
-        for e in self.entities.values():
-            if e.get_name() == 'Vehicle':
-                yield e.id, list(self._get_learned_skills(e))
+        for e in self._entities_by_name.get('Vehicle', {}).values():
+            yield e.id, list(self._get_learned_skills(e))
 
     def onBattleEnd(self, avatar, teamId, state):
         self._battle_result = dict(
@@ -237,15 +249,16 @@ class BattleController(IBattleController):
         self._players.create_or_update_players(
             pickle.loads(pickle_data))
 
-    def onArenaStateReceived(self, avatar, arenaUniqueId, teamBuildTypeId, preBattlesInfo, playersStates,
-                             observersState, buildingsInfo):
-        self._arena_id = arenaUniqueId
+    def onArenaStateReceived(self, avatar, arguments):
+        # pre-battles, observers and buildings blobs are not decoded
+        self._arena_id = arguments['arenaUniqueId']
         self._players.create_or_update_players(
-            pickle.loads(playersStates))
+            pickle.loads(arguments['playersStates']))
         self.create_player_state_list()
 
-    def onPlayerInfoUpdate(self, avatar, playersData, observersData):
-        self._players.create_or_update_players(pickle.loads(playersData))
+    def onPlayerInfoUpdate(self, avatar, arguments):
+        # playersData, observersData is not decoded
+        self._players.create_or_update_players(pickle.loads(arguments[0]))
         self.update_player_state_list()
 
     def receiveDamageStat(self, avatar, blob):
@@ -287,6 +300,15 @@ class BattleController(IBattleController):
         self._map = value.lstrip('spaces/')
 
 
+MINIMAP_PACK_PATTERN = (
+    (-2500.0, 2500.0, 11),
+    (-2500.0, 2500.0, 11),
+    (-3.141592753589793, 3.141592753589793, 9)
+)
+# smaller minimap diffs are unpacked entry by entry
+MINIMAP_BATCH_SIZE = 12
+
+
 def unpack_value(packed_value, value_min, value_max, bits):
     return packed_value / (2 ** bits - 1) * (abs(value_min) + abs(value_max)) - abs(value_min)
 
@@ -304,3 +326,27 @@ def unpack_values(packed_value, pack_pattern):
     except AssertionError:
         pass
     return tuple(values)
+
+
+def unpack_values_array(packed_values, pack_pattern):
+    """
+    unpack_values for NumPy array of ints at once,
+    returns array of shape (len(packed_values), len(pack_pattern))
+    """
+    shifts, masks, ranges, offsets = _get_pack_arrays(pack_pattern)
+    values = (packed_values[:, None] >> shifts) & masks
+    # same operations in same order as unpack_value, so results are equal
+    return values / masks * ranges - offsets
+
+
+@lru_cache()
+def _get_pack_arrays(pack_pattern):
+    shifts, masks, ranges, offsets = [], [], [], []
+    shift = 0
+    for min_value, max_value, bits in pack_pattern:
+        shifts.append(shift)
+        masks.append(2 ** bits - 1)
+        ranges.append(abs(min_value) + abs(max_value))
+        offsets.append(abs(min_value))
+        shift += bits
+    return numpy.array(shifts), numpy.array(masks), numpy.array(ranges), numpy.array(offsets)
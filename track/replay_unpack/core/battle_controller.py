@@ -1,8 +1,8 @@
 # coding=utf-8
 from abc import ABCMeta, abstractmethod
-from typing import Dict
+from typing import Dict, Optional
 
-from replay_unpack.core.entity import Entity
+from replay_unpack.core.entity import Entity, Subscriptions
 
 
 class IBattleController(metaclass=ABCMeta):
@@ -10,6 +10,14 @@ class IBattleController(metaclass=ABCMeta):
     Proxy to real battle controller of given version
     """
 
+    # Position packets are the bulk of a replay,
+    # players skip them unless controller needs entity positions
+    needs_positions = True
+
+    # entity callbacks owned by controller, released with it,
+    # None means Entity.default_subscriptions
+    subscriptions = None  # type: Optional[Subscriptions]
+
     @property
     @abstractmethod
     def entities(self) -> Dict[int, Entity]:
@@ -1,13 +1,41 @@
 # coding=utf-8
 import logging
+import warnings
 from copy import copy
 from enum import Enum
-from io import BytesIO
 from typing import Callable, Dict, List, Tuple
 
+from replay_unpack.core.network.payload_reader import PayloadReader
 from replay_unpack.core.entity_def import EntityDef
 from replay_unpack.core.entity_def import EntityFlags
 
+CLIENT_FLAGS = (
+    EntityFlags.ALL_CLIENTS |
+    EntityFlags.BASE_AND_CLIENT |
+    EntityFlags.OTHER_CLIENTS |
+    EntityFlags.OWN_CLIENT |
+    EntityFlags.CELL_PUBLIC_AND_OWN |
+    EntityFlags.ALL_CLIENTS
+)
+CLIENT_INTERNAL_FLAGS = (
+    EntityFlags.ALL_CLIENTS |
+    # not used for some reason
+    # EntityFlags.BASE_AND_CLIENT |
+    EntityFlags.OTHER_CLIENTS |
+    EntityFlags.OWN_CLIENT |
+    EntityFlags.CELL_PUBLIC_AND_OWN |
+    EntityFlags.ALL_CLIENTS
+)
+CELL_FLAGS = (
+    EntityFlags.CELL_PUBLIC_AND_OWN |
+    EntityFlags.CELL_PUBLIC
+    # | EntityFlags.CELL_PRIVATE
+)
+BASE_FLAGS = (
+    # EntityFlags.BASE |
+    EntityFlags.BASE_AND_CLIENT
+)
+
 
 class Entity:
     class Type(Enum):
@@ -18,12 +46,30 @@ class Entity:
         CELL = 2
         BASE = 4
 
-    _methods_subscriptions = {}  # type: Dict[Type, List[Callable]]
-    _properties_subscriptions = {}  # type: Dict[Type, List[Callable]]
+    __slots__ = (
+        'id',
+        '_spec',
+        '_methods',
+        'properties',
+        'volatiles',
+        'client_properties',
+        'client_properties_internal',
+        'cell_properties',
+        'base_properties',
+        '_is_on_aoi',
+        '_method_handlers',
+        '_property_handlers',
+    )
+
+    # used by entities created without own subscriptions
+    default_subscriptions = None  # type: Subscriptions
 
-    def __init__(self, id_: int, spec: EntityDef):
+    def __init__(self, id_: int, spec: EntityDef, subscriptions: 'Subscriptions' = None):
         self.id = id_
         self._spec = spec
+
+        # method and property tables are computed once per EntityDef
+        # and shared by all its entities
         self._methods = spec.client().get_exposed_index_map()
 
         # we had to store properties values because network protocol
@@ -37,38 +83,23 @@ class Entity:
         # position, yaw, pitch, roll
         self.volatiles = copy(spec.volatiles())
 
-        self.client_properties = spec.properties().get_properties_by_flags(
-            EntityFlags.ALL_CLIENTS |
-            EntityFlags.BASE_AND_CLIENT |
-            EntityFlags.OTHER_CLIENTS |
-            EntityFlags.OWN_CLIENT |
-            EntityFlags.CELL_PUBLIC_AND_OWN |
-            EntityFlags.ALL_CLIENTS,
-            exposed_index=True
-        )
-        self.client_properties_internal = spec.properties().get_properties_by_flags(
-            EntityFlags.ALL_CLIENTS |
-            # not used for some reason
-            # EntityFlags.BASE_AND_CLIENT |
-            EntityFlags.OTHER_CLIENTS |
-            EntityFlags.OWN_CLIENT |
-            EntityFlags.CELL_PUBLIC_AND_OWN |
-            EntityFlags.ALL_CLIENTS
-        )
-        self.cell_properties = spec.properties().get_properties_by_flags(
-            EntityFlags.CELL_PUBLIC_AND_OWN |
-            EntityFlags.CELL_PUBLIC
-            # | EntityFlags.CELL_PRIVATE
-        )
-        self.base_properties = spec.properties().get_properties_by_flags(
-            # EntityFlags.BASE |
-            EntityFlags.BASE_AND_CLIENT
-        )
+        properties = spec.properties()
+        self.client_properties = properties.get_properties_by_flags(CLIENT_FLAGS, exposed_index=True)
+        self.client_properties_internal = properties.get_properties_by_flags(CLIENT_INTERNAL_FLAGS)
+        self.cell_properties = properties.get_properties_by_flags(CELL_FLAGS)
+        self.base_properties = properties.get_properties_by_flags(BASE_FLAGS)
+
+        if subscriptions is None:
+            subscriptions = Entity.default_subscriptions
+        self._method_handlers, self._property_handlers = subscriptions.get_dispatch_tables(spec)
 
         self._is_on_aoi = True
 
     @property
     def is_on_aoi(self):
+        """
+        False after EntityLeave until entity enters area of interest again
+        """
         return self._is_on_aoi
 
     @is_on_aoi.setter
@@ -76,36 +107,55 @@ class Entity:
         self._is_on_aoi = value
 
     @classmethod
-    def subscribe_method_call(cls, entity_name: str, method_name: str, func: Callable):
+    def subscribe_method_call(cls, entity_name: str, method_name: str, func: Callable, lazy: bool = False):
         """
-        Add callbacks that should be triggered when given method called
+        Deprecated, add callbacks to battle controller's subscriptions instead.
+        Callbacks added here go to default subscriptions, which are shared by
+        every entity created without own subscriptions and are never released.
         """
-        if method_name not in cls._methods_subscriptions:
-            cls._methods_subscriptions[entity_name + '_' + method_name] = []
-        cls._methods_subscriptions[entity_name + '_' + method_name].append(func)
+        warnings.warn('Entity.subscribe_method_call is deprecated, '
+                      'use subscriptions of battle controller', DeprecationWarning, stacklevel=2)
+        cls.default_subscriptions.subscribe_method_call(entity_name, method_name, func, lazy)
 
     @classmethod
     def subscribe_property_change(cls, entity_name: str, prop_name: str, func: Callable):
         """
-        Add callbacks that should be triggered when given method called
+        Deprecated, add callbacks to battle controller's subscriptions instead,
+        see subscribe_method_call
         """
-        prop_hash = entity_name + '_' + prop_name
-        if prop_name not in cls._properties_subscriptions:
-            cls._properties_subscriptions[prop_hash] = []
-        cls._properties_subscriptions[prop_hash].append(func)
+        warnings.warn('Entity.subscribe_property_change is deprecated, '
+                      'use subscriptions of battle controller', DeprecationWarning, stacklevel=2)
+        cls.default_subscriptions.subscribe_property_change(entity_name, prop_name, func)
 
-    def call_client_method(self, exposed_index: int, payload: BytesIO):
-        method = self._methods[exposed_index]
-        logging.debug('calling %s method %s', self._spec.get_name(), method)
-        method_hash = self._spec.get_name() + '_' + method.get_name()
+    def has_method_subscriptions(self, exposed_index: int) -> bool:
+        """
+        Check if calling given method triggers any callbacks,
+        so that players can skip method packets undecoded
+        """
+        return bool(self._method_handlers[exposed_index])
 
-        subscriptions = Entity._methods_subscriptions.get(method_hash, [])
-        # print(method.get_name())
+    def call_client_method(self, exposed_index: int, payload: PayloadReader):
+        subscriptions = self._method_handlers[exposed_index]
         if not subscriptions:
             return
 
-        args, kwargs = method.create_from_stream(payload)
-        for func in subscriptions:
+        method = self._methods[exposed_index]
+        logging.debug('calling %s method %s', self._spec.get_name(), method)
+
+        arguments = None
+        if any(lazy for _, lazy in subscriptions):
+            start = payload.tell()
+            arguments = method.create_lazy_from_stream(payload)
+            payload.seek(start)
+
+        args, kwargs = None, None
+        if not all(lazy for _, lazy in subscriptions):
+            args, kwargs = method.create_from_stream(payload)
+
+        for func, lazy in subscriptions:
+            if lazy:
+                func(self, arguments)
+                continue
             try:
                 func(self, *args, **kwargs)
             except TypeError as e:
@@ -113,34 +163,28 @@ class Entity:
                               "and kwargs %s, problem: '%s'", func, args, kwargs, e)
                 raise
 
-    def set_client_property(self, exposed_index, payload: BytesIO):
-        logging.debug('requested property %s of entity %s', exposed_index, self._spec.get_name())
+    def set_client_property(self, exposed_index, payload: PayloadReader):
         prop = self.client_properties[exposed_index]
-        logging.debug('setting %s client property %s', self._spec.get_name(), prop)
         value = prop.create_from_stream(payload)
         self.properties['client'][prop.get_name()] = value
-        prop_hash = f"{self._spec.get_name()}_{prop.get_name()}"
-        subscriptions = Entity._properties_subscriptions.get(prop_hash, [])
-        if not subscriptions:
-            return
-        for func in subscriptions:
+        for func in self._property_handlers[exposed_index]:
             try:
                 func(self, value)
             except TypeError as e:
                 raise
 
-    def set_client_property_internal(self, internal_index, payload: BytesIO):
+    def set_client_property_internal(self, internal_index, payload: PayloadReader):
         logging.debug('requested property %s of entity %s', internal_index, self._spec.get_name())
         prop = self.client_properties_internal[internal_index]
         logging.debug('setting %s client property %s', self._spec.get_name(), prop)
         self.properties['client'][prop.get_name()] = prop.create_from_stream(payload)
 
-    def set_cell_property(self, internal_index, payload: BytesIO):
+    def set_cell_property(self, internal_index, payload: PayloadReader):
         prop = self.cell_properties[internal_index]
         logging.debug('setting %s cell property %s', self._spec.get_name(), prop)
         self.properties['cell'][prop.get_name()] = prop.create_from_stream(payload)
 
-    def set_base_property(self, internal_index, payload: BytesIO):
+    def set_base_property(self, internal_index, payload: PayloadReader):
         prop = self.base_properties[internal_index]
         logging.debug('setting %s base property %s', self._spec.get_name(), prop)
         self.properties['base'][prop.get_name()] = prop.create_from_stream(payload)
@@ -194,3 +238,68 @@ class Entity:
 
     def __repr__(self):
         return '{}<{}>'.format(self._spec.get_name(), self.id)
+
+
+class Subscriptions:
+    """
+    Entity callbacks of one battle controller, so that they are
+    released with it instead of piling up on Entity class
+    """
+
+    def __init__(self):
+        self._methods_subscriptions = {}  # type: Dict[str, List[Tuple[Callable, bool]]]
+        self._properties_subscriptions = {}  # type: Dict[str, List[Callable]]
+        # subscriptions of EntityDef by exposed method and client property index,
+        # shared by its entities and refilled in place when subscriptions change
+        self._dispatch_tables = {}  # type: Dict[EntityDef, Tuple[List[Tuple], List[Tuple]]]
+
+    def subscribe_method_call(self, entity_name: str, method_name: str, func: Callable, lazy: bool = False):
+        """
+        Add callbacks that should be triggered when given method called
+        Callbacks are called with entity and decoded arguments, or with
+        entity and LazyArguments when lazy=True, so that arguments
+        callback does not use are never decoded.
+        Every callback is kept and they are called in order they were added.
+        """
+        self._methods_subscriptions.setdefault(entity_name + '_' + method_name, []).append((func, lazy))
+        self._update_dispatch_tables()
+
+    def subscribe_property_change(self, entity_name: str, prop_name: str, func: Callable):
+        """
+        Add callbacks that should be triggered when given property changed
+        """
+        self._properties_subscriptions.setdefault(entity_name + '_' + prop_name, []).append(func)
+        self._update_dispatch_tables()
+
+    def clear(self):
+        """
+        Release all callbacks, entities stop triggering them
+        """
+        self._methods_subscriptions.clear()
+        self._properties_subscriptions.clear()
+        self._update_dispatch_tables()
+
+    def get_dispatch_tables(self, spec: EntityDef) -> Tuple[List[Tuple], List[Tuple]]:
+        tables = self._dispatch_tables.get(spec)
+        if tables is None:
+            tables = self._dispatch_tables[spec] = ([], [])
+            self._fill_dispatch_tables(spec, tables)
+        return tables
+
+    def _fill_dispatch_tables(self, spec: EntityDef, tables: Tuple[List[Tuple], List[Tuple]]):
+        method_handlers, property_handlers = tables
+        prefix = spec.get_name() + '_'
+        method_handlers[:] = [
+            tuple(self._methods_subscriptions.get(prefix + method.get_name(), ()))
+            for method in spec.client().get_exposed_index_map()]
+        property_handlers[:] = [
+            tuple(self._properties_subscriptions.get(prefix + prop.get_name(), ()))
+            for prop in spec.properties().get_properties_by_flags(CLIENT_FLAGS, exposed_index=True)]
+
+    def _update_dispatch_tables(self):
+        # tables are shared by existing entities, so they are updated in place
+        for spec, tables in self._dispatch_tables.items():
+            self._fill_dispatch_tables(spec, tables)
+
+
+Entity.default_subscriptions = Subscriptions()
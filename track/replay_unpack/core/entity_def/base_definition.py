@@ -2,22 +2,22 @@
 """
 This file provides the implementation of the UserDataObjectDescription class.
 """
-import os
-from io import BytesIO
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 from lxml import etree
 
+from replay_unpack.core.network.payload_reader import PayloadReader
 from .constants import ENTITIES_DEFS_PATH, EntityFlags
-from .data_types import Alias, DataType, INFINITY
+from .data_types import Alias, DataType, INFINITY, get_decoder
+from .scripts_store import Scripts
 
 
 class BaseDataObjectDef:
-    def __init__(self, base_dir: str, alias: Alias):
+    def __init__(self, scripts: Scripts, alias: Alias):
         self._properties = PropertiesDescriptions()
         self._volatile = {}
         self._alias = alias
-        self._base_dir = base_dir
+        self._scripts = scripts
 
     def _parse_implements(self, implements_list: etree.ElementBase):
         """
@@ -28,12 +28,12 @@ class BaseDataObjectDef:
             return
 
         for it in implements_list:
-            path = os.path.join(self._base_dir, ENTITIES_DEFS_PATH, 'interfaces', it.text.strip() + '.def')
-            parsed = etree.parse(path, parser=etree.XMLParser(
+            path = ENTITIES_DEFS_PATH + '/interfaces/' + it.text.strip() + '.def'
+            section = self._scripts.parse(
+                path,
                 remove_comments=True,
                 # use recover to ignore bad xsi sections
-                recover=True))
-            section = parsed.getroot()
+                recover=True)
             self._parse_section(section)
 
     def _parse_properties(self, props_list: etree.ElementBase):
@@ -79,6 +79,16 @@ class Property:
         self._type = type_
         self._default = type_.get_default_value(default)
         self._flags = getattr(EntityFlags, flags)
+        self._decoder = get_decoder(type_)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_decoder']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._decoder = get_decoder(self._type)
 
     def get_name(self):
         return self._name
@@ -106,8 +116,8 @@ class Property:
 
         return cls(section.tag, type_, flags=flags, default=default)
 
-    def create_from_stream(self, stream: BytesIO):
-        return self._type.create_from_stream(stream)
+    def create_from_stream(self, stream: PayloadReader):
+        return self._decoder(stream)
 
     def __repr__(self):
         return "{name} ({args})".format(
@@ -118,8 +128,10 @@ class PropertiesDescriptions:
     def __init__(self):
         self._internal_index: List[Property] = []
         self._props_by_name: Dict[str, Property] = {}
+        self._props_by_flags: Dict[Tuple[int, bool], List[Property]] = {}
 
     def parse(self, section: etree.ElementBase, alias) -> None:
+        self._props_by_flags.clear()
         for prop in section:
             obj = Property.from_section(prop, alias)
             # when same-named properties are in interface
@@ -134,7 +146,12 @@ class PropertiesDescriptions:
         """
         Get list of properties that match given flags
         Use exposed_index=True to sort properties by payload size
+        Result is computed once and shared, so it must not be modified
         """
+        key = (flags, exposed_index)
+        if key in self._props_by_flags:
+            return self._props_by_flags[key]
+
         props = []
         for prop in self._internal_index:
             if not prop._flags & flags:
@@ -144,4 +161,5 @@ class PropertiesDescriptions:
         # client-server index, ordered props by payload size
         if exposed_index:
             props.sort(key=lambda i: i.get_size_in_bytes())
+        self._props_by_flags[key] = props
         return props
@@ -1,10 +1,14 @@
 # coding=utf-8
-import os
-from typing import Dict
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 
 from lxml import etree
 
+from ..constants import ALIASES_FILE
+from ..scripts_store import Scripts
 from .base import DataType
+from .compiler import compile_sequence, get_decoder, get_skipper
 from .constants import INFINITY
 from .math import (
     Vector2,
@@ -32,6 +36,10 @@ from .other import (
     Mailbox,
     UserType)
 
+# alias data types by content digest and header size,
+# shared by all versions that define alias the same way
+_shared_types: Dict[Tuple[str, int], DataType] = {}
+
 
 class Alias:
     SIMPLE_TYPES = {
@@ -60,32 +68,80 @@ class Alias:
         'USER_TYPE': UserType,  # almost the same
     }
 
-    def __init__(self, base_dir: str):
-        self._mapping: Dict[str, DataType] = {}
+    def __init__(self, scripts: Scripts):
+        # resolved aliases by name and header size, shared by every
+        # property, argument and type referencing them, must not be modified
+        self._mapping: Dict[Tuple[str, int], DataType] = {}
         self._alias: Dict[str, etree.ElementBase] = {}
-        self._initialize(base_dir)
+        self._digests: Dict[str, str] = {}
+        self._used: Optional[List[Tuple[str, str]]] = None
+        self._initialize(scripts)
 
     def get_data_type_from_section(self, section: etree.ElementBase, header_size=1) -> DataType:
         type_name = section.text.strip()
 
         if type_name in self._alias:
-            return self.get_data_type_from_section(self._alias[type_name], header_size)
+            if self._used is not None:
+                self._used.append((type_name, self.get_alias_digest(type_name)))
+            return self.get_alias_data_type(type_name, header_size)
         elif type_name in self.SIMPLE_TYPES:
             return self.SIMPLE_TYPES[type_name].from_section(self, section, header_size)
         else:
             raise RuntimeError("%s is unknown" % type_name)
 
-    def _initialize(self, base_dir):
-        alias_path = os.path.join(base_dir, 'scripts/entity_defs/alias.xml')
-        if not os.path.exists(alias_path):
-            raise RuntimeError("Not supported version")
+    def get_alias_data_type(self, name: str, header_size=1) -> DataType:
+        key = (name, header_size)
+        data_type = self._mapping.get(key)
+        if data_type is None:
+            shared_key = (self.get_alias_digest(name), header_size)
+            data_type = _shared_types.get(shared_key)
+            if data_type is None:
+                data_type = _shared_types[shared_key] = self.get_data_type_from_section(
+                    self._alias[name], header_size)
+            self._mapping[key] = data_type
+        return data_type
+
+    def get_alias_digest(self, name: str) -> Optional[str]:
+        """
+        Hash of alias section and of all aliases it refers to,
+        None if alias is not defined
+        """
+        if name not in self._alias:
+            return None
+        digest = self._digests.get(name)
+        if digest is None:
+            section = self._alias[name]
+            content = hashlib.sha1(etree.tostring(section, with_tail=False))
+            for used_name in sorted({item.text.strip() for item in section.iter()
+                                     if item.text and item.text.strip() in self._alias} - {name}):
+                content.update(self.get_alias_digest(used_name).encode())
+            digest = self._digests[name] = content.hexdigest()
+        return digest
+
+    @contextmanager
+    def record_used(self):
+        """
+        Collect (name, digest) of every alias referenced inside the block
+        """
+        used = self._used = []
+        try:
+            yield used
+        finally:
+            self._used = None
+
+    def __getstate__(self):
+        # xml sections can not be pickled, keep them as text
+        state = self.__dict__.copy()
+        state['_alias'] = {k: etree.tostring(v) for k, v in self._alias.items()}
+        return state
+
+    def __setstate__(self, state):
+        state['_alias'] = {k: etree.fromstring(v) for k, v in state['_alias'].items()}
+        self.__dict__.update(state)
 
-        with open(alias_path, 'rb') as f:
-            xml = etree.parse(f, parser=etree.XMLParser(encoding='utf8',
-                remove_comments=True))
-            for item in xml.getroot():
-                self._alias[item.tag] = item
+    def _initialize(self, scripts: Scripts):
+        for item in scripts.parse(ALIASES_FILE, encoding='utf8', remove_comments=True):
+            self._alias[item.tag] = item
 
-        for key, section in self._alias.items():
-            _type = self.get_data_type_from_section(section)
-            self._mapping[key] = _type
+        for name in self._alias:
+            self.get_alias_data_type(name)
@@ -4,6 +4,8 @@ from io import BytesIO
 
 from lxml import etree
 
+from replay_unpack.core.network.payload_reader import PayloadReader
+
 
 class DataType:
     DEFAULT_VALUE = None
@@ -30,10 +32,10 @@ class DataType:
         logging.debug('Parsing default value for %s', self.__class__.__name__)
         return self._get_default_value_from_section(default)
 
-    def create_from_stream(self, stream: BytesIO, header_size: int = 1):
+    def create_from_stream(self, stream: PayloadReader, header_size: int = 1):
         return self._get_value_from_stream(stream, header_size)
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         raise NotImplementedError()
 
     def write_to_stream(self, stream: BytesIO):
@@ -45,5 +47,14 @@ class DataType:
     def get_size_in_bytes(self):
         return self._DATA_SIZE
 
+    def __getstate__(self):
+        # compiled decoder, skipper and generated record type
+        # can not be pickled, they are created again on demand
+        state = self.__dict__.copy()
+        state.pop('_decoder', None)
+        state.pop('_skipper', None)
+        state.pop('_record_type', None)
+        return state
+
     def __repr__(self):
         return "<{}>".format(self.__class__.__name__)
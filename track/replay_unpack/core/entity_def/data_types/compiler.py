@@ -0,0 +1,369 @@
+# coding=utf-8
+"""
+Compiles DataType trees into flat decoder functions.
+
+A decoder takes a PayloadReader and returns the same value
+as DataType.create_from_stream, but types are resolved once,
+and runs of fixed-size numeric and vector fields are read
+with a single struct.Struct.
+
+A skipper moves a PayloadReader past a value without decoding it,
+using fixed sizes and length prefixes.
+"""
+import os
+import struct
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from replay_unpack.core.network.payload_reader import PayloadReader
+from .base import DataType
+from .math import _MathType
+from .nested_types import PyFixedList
+from .numeric import _NumericType
+from .other import Array, Blob, FixedDict, Mailbox, Python, String, UserType
+
+Decoder = Callable[[PayloadReader], object]
+Skipper = Callable[[PayloadReader], None]
+# builds value from unpacked struct values, starting at given offset
+Builder = Callable[[tuple, int], object]
+# struct format, count of unpacked values, builder
+FixedLayout = Tuple[str, int, Builder]
+
+BYTE = struct.Struct('=B')
+SHORT = struct.Struct('=H')
+
+
+def get_decoder(data_type: DataType) -> Decoder:
+    """
+    Compiled decoder of data type, cached on the type itself
+    """
+    decoder = data_type.__dict__.get('_decoder')
+    if decoder is None:
+        decoder = data_type._decoder = _compile(data_type)
+    return decoder
+
+
+def get_skipper(data_type: DataType) -> Skipper:
+    """
+    Compiled skipper of data type, cached on the type itself
+    """
+    skipper = data_type.__dict__.get('_skipper')
+    if skipper is None:
+        skipper = data_type._skipper = _compile_skipper(data_type)
+    return skipper
+
+
+def compile_sequence(types: Sequence[DataType]) -> Callable[[PayloadReader], List]:
+    """
+    Decoder of values of given types stored one after another,
+    e.g. method arguments or fixed dict fields
+    """
+    steps = []
+    run = []
+
+    def flush_run():
+        if run:
+            steps.append(_compile_fixed_run(list(run)))
+            run.clear()
+
+    for type_ in types:
+        layout = _get_fixed_layout(type_)
+        if layout is not None:
+            run.append(layout)
+        else:
+            flush_run()
+            steps.append(_compile_variable_step(get_decoder(type_)))
+    flush_run()
+
+    def decode(stream):
+        values = []
+        for step in steps:
+            step(stream, values)
+        return values
+
+    return decode
+
+
+def _scalar(values, offset):
+    return values[offset]
+
+
+def _get_fixed_layout(data_type: DataType) -> Optional[FixedLayout]:
+    if isinstance(data_type, _NumericType):
+        return data_type.STRUCT_TYPE, 1, _scalar
+
+    if isinstance(data_type, _MathType):
+        count = len(data_type.STRUCT_TYPE)
+        return data_type.STRUCT_TYPE, count, lambda values, offset: values[offset:offset + count]
+
+    if isinstance(data_type, UserType):
+        return _get_fixed_layout(data_type.type)
+
+    if isinstance(data_type, FixedDict) and not data_type.allow_none:
+        layouts = [_get_fixed_layout(t) for t in data_type.attributes.values()]
+        if None in layouts:
+            return None
+        from_values = data_type.get_record_type().from_values
+        fmt, count, parts = _merge_layouts(layouts)
+
+        if all(builder is _scalar for builder, _ in parts):
+            return fmt, count, lambda values, offset: from_values(values[offset:offset + count])
+        return fmt, count, lambda values, offset: from_values(
+            [builder(values, offset + o) for builder, o in parts])
+
+    if isinstance(data_type, Array) and data_type.array_size is not None:
+        layout = _get_fixed_layout(data_type.type)
+        if layout is None:
+            return None
+        element_fmt, element_count, builder = layout
+        element_type, size = data_type.type, data_type.array_size
+        return element_fmt * size, element_count * size, lambda values, offset: PyFixedList(
+            element_type, [builder(values, offset + i * element_count) for i in range(size)])
+
+    return None
+
+
+def _merge_layouts(layouts: List[FixedLayout]) -> Tuple[str, int, List[Tuple[Builder, int]]]:
+    fmt, count, parts = '', 0, []
+    for layout_fmt, layout_count, builder in layouts:
+        parts.append((builder, count))
+        fmt += layout_fmt
+        count += layout_count
+    return fmt, count, parts
+
+
+def _compile_fixed_run(layouts: List[FixedLayout]):
+    fmt, count, parts = _merge_layouts(layouts)
+    unpack = struct.Struct('=' + fmt)
+
+    if all(builder is _scalar for builder, _ in parts):
+        def step(stream, values):
+            values.extend(stream.unpack(unpack))
+    else:
+        def step(stream, values):
+            unpacked = stream.unpack(unpack)
+            values.extend([builder(unpacked, offset) for builder, offset in parts])
+    return step
+
+
+def _compile_variable_step(decoder: Decoder):
+    def step(stream, values):
+        values.append(decoder(stream))
+    return step
+
+
+def _read_size(stream) -> int:
+    size, = stream.unpack(BYTE)
+    # hack for arenaStateReceived
+    if size == 0xff:
+        size, = stream.unpack(SHORT)
+        # some dummy shit
+        stream.unpack(BYTE)
+    return size
+
+
+def _read_exact(stream, size: int):
+    # PayloadReader.read and seek stop at end of payload, while
+    # DataType path unpacks fixed-size values and fails on short data
+    data = stream.read(size)
+    if len(data) != size:
+        raise struct.error('unpack requires a buffer of %d bytes' % size)
+    return data
+
+
+def _skip_exact(stream, size: int):
+    position = stream.tell()
+    if stream.seek(size, os.SEEK_CUR) - position != size:
+        raise struct.error('unpack requires a buffer of %d bytes' % size)
+
+
+def _decode_blob(stream):
+    # value outlives the packet, so it is copied out of the replay buffer
+    return bytes(stream.read(_read_size(stream)))
+
+
+def _decode_string(stream):
+    value = bytes(stream.read(_read_size(stream)))
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        # probably this is a pickle string or smtg like that
+        return value
+
+
+def _decode_python(stream):
+    size, = stream.unpack(BYTE)
+    return bytes(stream.read(size))
+
+
+def _decode_mailbox(stream):
+    return None
+
+
+def _compile(data_type: DataType) -> Decoder:
+    layout = _get_fixed_layout(data_type)
+    if layout is not None:
+        fmt, count, builder = layout
+        unpack = struct.Struct('=' + fmt)
+        if builder is _scalar:
+            return lambda stream: stream.unpack(unpack)[0]
+        return lambda stream: builder(stream.unpack(unpack), 0)
+
+    if isinstance(data_type, String):
+        return _decode_string
+    if isinstance(data_type, Blob):
+        return _decode_blob
+    if isinstance(data_type, Python):
+        return _decode_python
+    if isinstance(data_type, Mailbox):
+        return _decode_mailbox
+    if isinstance(data_type, UserType):
+        return get_decoder(data_type.type)
+    if isinstance(data_type, FixedDict):
+        return _compile_fixed_dict(data_type)
+    if isinstance(data_type, Array):
+        return _compile_array(data_type)
+
+    # unknown type, fall back to walking it
+    return lambda stream: data_type.create_from_stream(stream)
+
+
+def _compile_fixed_dict(data_type: FixedDict) -> Decoder:
+    from_values = data_type.get_record_type().from_values
+    decode_fields = compile_sequence(list(data_type.attributes.values()))
+
+    if not data_type.allow_none:
+        return lambda stream: from_values(decode_fields(stream))
+
+    def decode(stream):
+        stream_pos = stream.tell()
+        flag = stream.read(1)
+        if flag == b'\x00':
+            return None
+        elif flag != b'\x01':
+            stream.seek(stream_pos)
+        return from_values(decode_fields(stream))
+
+    return decode
+
+
+def _compile_array(data_type: Array) -> Decoder:
+    element_type, array_size = data_type.type, data_type.array_size
+    layout = _get_fixed_layout(element_type)
+
+    if layout is None:
+        decode_element = get_decoder(element_type)
+
+        def decode(stream):
+            size = array_size if array_size is not None else stream.unpack(BYTE)[0]
+            return PyFixedList(element_type, [decode_element(stream) for _ in range(size)])
+
+        return decode
+
+    fmt, count, builder = layout
+    element = struct.Struct('=' + fmt)
+    element_size = element.size
+
+    def decode(stream):
+        size = array_size if array_size is not None else stream.unpack(BYTE)[0]
+        if not size:
+            return PyFixedList(element_type)
+        unpacked = element.iter_unpack(_read_exact(stream, element_size * size))
+        if builder is _scalar:
+            return PyFixedList(element_type, [values[0] for values in unpacked])
+        return PyFixedList(element_type, [builder(values, 0) for values in unpacked])
+
+    return decode
+
+
+def _seek_by(size: int) -> Skipper:
+    return lambda stream: _skip_exact(stream, size)
+
+
+def _skip_sized(stream):
+    _skip_exact(stream, _read_size(stream))
+
+
+def _skip_python(stream):
+    size, = stream.unpack(BYTE)
+    _skip_exact(stream, size)
+
+
+def _skip_mailbox(stream):
+    pass
+
+
+def _compile_skipper(data_type: DataType) -> Skipper:
+    layout = _get_fixed_layout(data_type)
+    if layout is not None:
+        return _seek_by(struct.calcsize('=' + layout[0]))
+
+    if isinstance(data_type, (String, Blob)):
+        return _skip_sized
+    if isinstance(data_type, Python):
+        return _skip_python
+    if isinstance(data_type, Mailbox):
+        return _skip_mailbox
+    if isinstance(data_type, UserType):
+        return get_skipper(data_type.type)
+    if isinstance(data_type, FixedDict):
+        return _compile_fixed_dict_skipper(data_type)
+    if isinstance(data_type, Array):
+        return _compile_array_skipper(data_type)
+
+    # unknown type, decode and drop the value
+    return lambda stream: data_type.create_from_stream(stream)
+
+
+def _compile_fixed_dict_skipper(data_type: FixedDict) -> Skipper:
+    # neighbouring fixed-size fields are skipped at once
+    skippers = []
+    fixed_size = 0
+    for type_ in data_type.attributes.values():
+        layout = _get_fixed_layout(type_)
+        if layout is not None:
+            fixed_size += struct.calcsize('=' + layout[0])
+            continue
+        if fixed_size:
+            skippers.append(_seek_by(fixed_size))
+            fixed_size = 0
+        skippers.append(get_skipper(type_))
+    if fixed_size:
+        skippers.append(_seek_by(fixed_size))
+
+    allow_none = data_type.allow_none
+
+    def skip(stream):
+        if allow_none:
+            stream_pos = stream.tell()
+            flag = stream.read(1)
+            if flag == b'\x00':
+                return
+            elif flag != b'\x01':
+                stream.seek(stream_pos)
+        for skipper in skippers:
+            skipper(stream)
+
+    return skip
+
+
+def _compile_array_skipper(data_type: Array) -> Skipper:
+    array_size = data_type.array_size
+    layout = _get_fixed_layout(data_type.type)
+
+    if layout is not None:
+        element_size = struct.calcsize('=' + layout[0])
+
+        def skip(stream):
+            size = array_size if array_size is not None else stream.unpack(BYTE)[0]
+            _skip_exact(stream, element_size * size)
+
+        return skip
+
+    skip_element = get_skipper(data_type.type)
+
+    def skip(stream):
+        size = array_size if array_size is not None else stream.unpack(BYTE)[0]
+        for _ in range(size):
+            skip_element(stream)
+
+    return skip
@@ -1,23 +1,27 @@
 # coding=utf-8
 import struct
-from io import BytesIO
 
 from lxml.etree import Element
 
+from replay_unpack.core.network.payload_reader import PayloadReader
 from .base import DataType
 
 
 class _MathType(DataType):
     STRUCT_TYPE = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # kept on the class, so values referencing types stay picklable
+        cls._STRUCT = struct.Struct(cls.STRUCT_TYPE)
+
     def __init__(self, header_size=1):
         assert self.STRUCT_TYPE is not None, \
             "You must define STRUCT_TYPE first"
         super().__init__(header_size=header_size)
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
-        return tuple(struct.unpack(
-            self.STRUCT_TYPE, stream.read(self._DATA_SIZE)))
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
+        return stream.unpack(self._STRUCT)
 
     def _get_default_value_from_section(self, value: Element):
         raise RuntimeError("_get_default_value_from_section for %s is not defined" % self.__class__.__name__)
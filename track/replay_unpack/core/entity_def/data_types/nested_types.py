@@ -3,12 +3,14 @@
 Dirty hack to simplify nested property and slices
 Override list and dict types to store information about types
 """
+from copy import deepcopy
 
 
 class PyFixedDict(dict):
     """
     Emulate BigWorld type PyFixedDict
     """
+    __slots__ = ('_attributes',)
 
     def __init__(self, attributes, *args, **kwargs):
         self._attributes = attributes
@@ -21,6 +23,67 @@ class PyFixedDict(dict):
         return list(self._attributes.values())[index]
 
 
+class PyFixedDictRecord(PyFixedDict):
+    """
+    Base of record types generated for every FIXED_DICT type,
+    attributes and field tables are stored once in the class
+    instead of every value
+    """
+    __slots__ = ()
+
+    _names = ()
+    _types = ()
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Create record from field values in definition order
+        """
+        return cls(zip(cls._names, values))
+
+    def get_field_name_for_index(self, index):
+        return self._names[index]
+
+    def get_field_type_for_index(self, index):
+        return self._types[index]
+
+    def get_field_by_index(self, index):
+        return self[self._names[index]]
+
+    def set_field_by_index(self, index, value):
+        self[self._names[index]] = value
+
+    def __copy__(self):
+        return self.__class__(self)
+
+    def __deepcopy__(self, memo):
+        result = memo[id(self)] = self.__class__()
+        for key, value in self.items():
+            result[key] = deepcopy(value, memo)
+        return result
+
+    def __reduce__(self):
+        # generated types can not be imported by name and their attributes
+        # reference the whole definitions tree, so records are pickled
+        # as plain dicts of field names and values
+        return dict, (dict(self),)
+
+
+def make_record_type(attributes) -> type:
+    """
+    Generate record type for FIXED_DICT with given attributes
+    """
+    return type('PyFixedDictRecord', (PyFixedDictRecord,), {
+        '__slots__': (),
+        '_attributes': attributes,
+        '_names': tuple(attributes.keys()),
+        '_types': tuple(attributes.values()),
+    })
+
+
 # TODO: hardcoded list len
 class PyFixedList(list):
     """
@@ -38,3 +101,15 @@ class PyFixedList(list):
 
     def get_element_type(self):
         return self._element_type
+
+    def __copy__(self):
+        return self.__class__(self._element_type, self)
+
+    def __deepcopy__(self, memo):
+        result = memo[id(self)] = self.__class__(self._element_type)
+        result.extend(deepcopy(value, memo) for value in self)
+        return result
+
+    def __reduce__(self):
+        # element type references the definitions tree, same as records
+        return list, (list(self),)
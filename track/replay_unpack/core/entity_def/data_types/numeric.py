@@ -1,9 +1,9 @@
 # coding=utf-8
 import struct
-from io import BytesIO
 
 from lxml import etree
 
+from replay_unpack.core.network.payload_reader import PayloadReader
 from .base import DataType
 
 
@@ -11,13 +11,18 @@ class _NumericType(DataType):
     STRUCT_TYPE = None
     PYTHON_TYPE = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # kept on the class, so values referencing types stay picklable
+        cls._STRUCT = struct.Struct(cls.STRUCT_TYPE)
+
     def __init__(self, header_size=1):
         assert None not in [self.STRUCT_TYPE, self.PYTHON_TYPE], \
             "You must define STRUCT_TYPE and PYTHON_TYPE first"
         super().__init__(header_size=header_size)
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
-        return struct.unpack(self.STRUCT_TYPE, stream.read(self._DATA_SIZE))[0]
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
+        return stream.unpack(self._STRUCT)[0]
 
     def _get_default_value_from_section(self, section: etree.ElementBase):
         return self.PYTHON_TYPE(section.text.strip())
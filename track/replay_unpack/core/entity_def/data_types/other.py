@@ -1,21 +1,21 @@
 # coding=utf-8
 import logging
 from collections import OrderedDict
-from io import BytesIO
 from struct import unpack
 from typing import Iterable, Dict
 
 from lxml import etree
 
+from replay_unpack.core.network.payload_reader import PayloadReader
 from .base import DataType
 from .constants import INFINITY
-from .nested_types import PyFixedDict, PyFixedList
+from .nested_types import PyFixedList, make_record_type
 from .numeric import UInt8
 
 
 class _DataType(DataType):
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size):
         raise NotImplementedError
 
     def _get_default_value_from_section(self, section: etree.ElementBase):
@@ -33,7 +33,7 @@ class Blob(_DataType):
     """
     _DATA_SIZE = INFINITY
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         size, = unpack('B', stream.read(1))
         # hack for arenaStateReceived
         if size == 0xff:
@@ -41,8 +41,8 @@ class Blob(_DataType):
             # some dummy shit
             unpack('B', stream.read(1))
 
-            return stream.read(size)
-        return stream.read(size)
+        # value outlives the packet, so it is copied out of the replay buffer
+        return bytes(stream.read(size))
 
 
 class String(_DataType):
@@ -55,7 +55,7 @@ class String(_DataType):
     _DATA_SIZE = INFINITY
     DEFAULT_VALUE = ''
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         size, = unpack('B', stream.read(1))
         # hack for arenaStateReceived
         if size == 0xff:
@@ -63,9 +63,7 @@ class String(_DataType):
             # some dummy shit
             unpack('B', stream.read(1))
 
-            _str = stream.read(size)
-        else:
-            _str = stream.read(size)
+        _str = bytes(stream.read(size))
         try:
             return _str.decode('utf-8')
         except UnicodeDecodeError:
@@ -88,9 +86,9 @@ class Python(_DataType):
 
     _DATA_SIZE = INFINITY
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         size, = unpack('B', stream.read(1))
-        return stream.read(size)
+        return bytes(stream.read(size))
 
 
 class FixedDict(_DataType):
@@ -100,7 +98,16 @@ class FixedDict(_DataType):
         self.attributes = attributes  # type: OrderedDict
         super(FixedDict, self).__init__(header_size=header_size)
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def get_record_type(self):
+        """
+        Record type of values, generated once per FixedDict type
+        """
+        record_type = self.__dict__.get('_record_type')
+        if record_type is None:
+            record_type = self._record_type = make_record_type(self.attributes)
+        return record_type
+
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         stream_pos = stream.tell()
 
         # bada-boom, empty dict :)
@@ -116,7 +123,7 @@ class FixedDict(_DataType):
             else:
                 stream.seek(stream_pos)
 
-        kw = PyFixedDict(self.attributes)
+        kw = self.get_record_type()()
         for key, _type in self.attributes.items():
             kw[key] = _type.create_from_stream(stream, header_size=header_size)
         return kw
@@ -155,7 +162,7 @@ class Array(_DataType):
         self.type = _type
         super(Array, self).__init__(header_size=header_size)
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         result = PyFixedList(self.type)
 
         size = self.array_size
@@ -212,7 +219,7 @@ class UserType(_DataType):
         self.type = _type
         super(UserType, self).__init__(header_size=header_size)
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         return self.type.create_from_stream(stream, header_size=header_size)
 
     @classmethod
@@ -234,7 +241,7 @@ class UserType(_DataType):
 class Mailbox(_DataType):
     _DATA_SIZE = INFINITY
 
-    def _get_value_from_stream(self, stream: BytesIO, header_size: int):
+    def _get_value_from_stream(self, stream: PayloadReader, header_size: int):
         pass
 
     def __repr__(self):
@@ -1,21 +1,94 @@
 # coding=utf-8
+import hashlib
+import logging
 import os
-from typing import Dict
+import pickle
+from typing import Dict, List, Tuple
 
 from lxml import etree
 
-from .constants import ENTITIES_DEFS_PATH
+from .constants import ENTITIES_DEFS_PATH, ENTITIES_FILE
 from .data_types import Alias
 from .entity_description import EntityDef
+from .scripts_store import Scripts
+
+# bump when parsed definition classes change their attributes
+CACHE_VERSION = 7
+CACHE_FILE_NAME = 'definitions.cache'
+
+_loaded: Dict[str, Tuple[str, 'Definitions']] = {}
+
+# entity definitions shared by versions by name, along with (path, hash)
+# of every script and (name, digest) of every alias they were parsed from
+_entity_defs: Dict[str, List[Tuple[List[Tuple[str, str]], List[Tuple[str, str]], EntityDef]]] = {}
 
 
 class Definitions:
+    @classmethod
+    def load(cls, base_dir: str) -> 'Definitions':
+        """
+        Parsed definitions for base_dir, memoized in-process and pickled
+        to base_dir/definitions.cache. Both are invalidated when
+        scripts manifest changes, or, for plain scripts directory,
+        when any file in it changes its mtime or size.
+        Loaded definitions are shared, they must not be modified.
+        """
+        base_dir = os.path.abspath(base_dir)
+        fingerprint = cls._get_fingerprint(Scripts(base_dir))
+
+        if base_dir in _loaded and _loaded[base_dir][0] == fingerprint:
+            return _loaded[base_dir][1]
+
+        cache_path = os.path.join(base_dir, CACHE_FILE_NAME)
+        definitions = cls._read_cache(cache_path, fingerprint)
+        if definitions is None:
+            definitions = cls(base_dir)
+            cls._write_cache(cache_path, fingerprint, definitions)
+
+        _loaded[base_dir] = (fingerprint, definitions)
+        return definitions
+
+    @staticmethod
+    def _get_fingerprint(scripts: Scripts) -> str:
+        return hashlib.sha1(f'{CACHE_VERSION}:{scripts.get_fingerprint()}'.encode()).hexdigest()
+
+    @classmethod
+    def _read_cache(cls, path: str, fingerprint: str):
+        try:
+            with open(path, 'rb') as f:
+                # fingerprint is pickled separately, so stale
+                # caches are rejected without loading definitions
+                if pickle.load(f) != fingerprint:
+                    return None
+                definitions = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.exception('Failed to read definitions cache %s', path)
+            return None
+        return definitions if isinstance(definitions, cls) else None
+
+    @staticmethod
+    def _write_cache(path: str, fingerprint: str, definitions: 'Definitions'):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump(fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(definitions, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            # e.g. read-only install, in-process memo still works
+            logging.warning('Failed to write definitions cache %s', path, exc_info=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
     def __init__(self, base_dir):
-        self._alias = Alias(base_dir)
+        scripts = Scripts(base_dir)
+        self._alias = Alias(scripts)
 
         self._entity_defs_by_name: Dict[str, EntityDef] = {}
         self._entity_defs_by_index: Dict[int, EntityDef] = {}
-        self._parse(base_dir)
+        self._parse(scripts)
 
     def get_entity_def_by_name(self, name):
         return self._entity_defs_by_name[name]
@@ -24,17 +97,25 @@ class Definitions:
         # bigworld counts entities from 1
         return self._entity_defs_by_index[index - 1]
 
-    def _parse_entities(self, base_dir: str, entities: etree.ElementBase):
+    def _get_entity_def(self, scripts: Scripts, name: str) -> EntityDef:
+        for reads, used, entity_def in _entity_defs.get(name, []):
+            if all(scripts.exists(path) and scripts.get_hash(path) == digest for path, digest in reads) and \
+                    all(self._alias.get_alias_digest(alias) == digest for alias, digest in used):
+                return entity_def
+
+        with scripts.record_reads() as reads, self._alias.record_used() as used:
+            section = scripts.parse(ENTITIES_DEFS_PATH + '/' + name + '.def', remove_comments=True)
+            entity_def = EntityDef(scripts, name, section, self._alias)
+        _entity_defs.setdefault(name, []).append((sorted(set(reads)), sorted(set(used)), entity_def))
+        return entity_def
+
+    def _parse_entities(self, scripts: Scripts, entities: etree.ElementBase):
         for index, entity_section in enumerate(entities):
-            path = os.path.join(base_dir, ENTITIES_DEFS_PATH, entity_section.tag + '.def')
-            section = etree.parse(path, parser=etree.XMLParser(remove_comments=True))
-            entity_def = EntityDef(base_dir, entity_section.tag, section, self._alias)
+            entity_def = self._get_entity_def(scripts, entity_section.tag)
 
             self._entity_defs_by_name[entity_section.tag] = entity_def
             self._entity_defs_by_index[index] = entity_def
 
-    def _parse(self, base_dir):
-        tree = etree.parse(os.path.join(base_dir, 'scripts/entities.xml'),
-                           parser=etree.XMLParser(remove_comments=True))
-        root = tree.getroot()
-        self._parse_entities(base_dir, root.find('ClientServerEntities'))
+    def _parse(self, scripts: Scripts):
+        root = scripts.parse(ENTITIES_FILE, remove_comments=True)
+        self._parse_entities(scripts, root.find('ClientServerEntities'))
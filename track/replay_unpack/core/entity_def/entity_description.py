@@ -1,11 +1,12 @@
 # coding=utf-8
-from io import BytesIO
 from typing import List, Dict, Tuple
 
 from lxml import etree
 
+from replay_unpack.core.network.payload_reader import PayloadReader
 from .base_definition import BaseDataObjectDef
-from .data_types import DataType, Alias, INFINITY
+from .data_types import DataType, Alias, INFINITY, compile_sequence, get_decoder, get_skipper
+from .scripts_store import Scripts
 
 DEFAULT_HEADER_SIZE = 1
 
@@ -27,6 +28,26 @@ class EntityMethod:
         self._name = name or None
         self._arguments = arguments
         self._variable_header_size = header_size
+        self._compile()
+
+    def _compile(self):
+        self._decode_arguments = compile_sequence([arg.type for arg in self._arguments])
+        self._argument_names = [arg.name for arg in self._arguments]
+        self._has_kwargs = any(name is not None for name in self._argument_names)
+        # used by LazyArguments
+        self._argument_indexes = {name: i for i, name in enumerate(self._argument_names) if name is not None}
+        self._argument_decoders = [get_decoder(arg.type) for arg in self._arguments]
+        self._argument_skippers = [get_skipper(arg.type) for arg in self._arguments]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ('_decode_arguments', '_argument_decoders', '_argument_skippers'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
 
     def get_name(self):
         return self._name
@@ -71,29 +92,80 @@ class EntityMethod:
 
         return cls(section.tag, list(args), header_size)
 
-    def create_from_stream(self, stream: BytesIO) -> Tuple[List, Dict[str, object]]:
+    def create_from_stream(self, stream: PayloadReader) -> Tuple[List, Dict[str, object]]:
+        values = self._decode_arguments(stream)
+        if not self._has_kwargs:
+            return values, {}
+
         unpacked_args = []
         unpacked_kwargs = {}
-        for arg in self._arguments:
-            unpacked = arg.type.create_from_stream(stream, self._variable_header_size)
-            if arg.name is None:
+        for name, unpacked in zip(self._argument_names, values):
+            if name is None:
                 unpacked_args.append(unpacked)
             else:
-                unpacked_kwargs[arg.name] = unpacked
+                unpacked_kwargs[name] = unpacked
 
         return unpacked_args, unpacked_kwargs
 
+    def create_lazy_from_stream(self, stream: PayloadReader) -> 'LazyArguments':
+        """
+        Arguments that are decoded on first access, see LazyArguments;
+        rest of the stream is consumed
+        """
+        return LazyArguments(self, PayloadReader(stream.read()))
+
     def __repr__(self):
         return "{name} ({args})".format(
             name=self._name, args=self._arguments)
 
 
+class LazyArguments:
+    """
+    View of method arguments that decodes each argument on first access,
+    by position or by name. Arguments before it are skipped
+    using their fixed sizes or length prefixes, not decoded.
+    """
+    __slots__ = ('_method', '_stream', '_offsets', '_values')
+
+    def __init__(self, method: EntityMethod, stream: PayloadReader):
+        self._method = method
+        self._stream = stream
+        # offsets of arguments found so far
+        self._offsets = [stream.tell()]
+        self._values = {}
+
+    def __len__(self):
+        return len(self._method._arguments)
+
+    def __getitem__(self, key):
+        index = self._method._argument_indexes[key] if isinstance(key, str) else key
+        if index in self._values:
+            return self._values[index]
+        if not 0 <= index < len(self):
+            raise IndexError(key)
+
+        stream, offsets = self._stream, self._offsets
+        while len(offsets) <= index:
+            stream.seek(offsets[-1])
+            self._method._argument_skippers[len(offsets) - 1](stream)
+            offsets.append(stream.tell())
+
+        stream.seek(offsets[index])
+        value = self._values[index] = self._method._argument_decoders[index](stream)
+        return value
+
+    def __repr__(self):
+        return "<LazyArguments> {} decoded {}".format(self._method.get_name(), self._values)
+
+
 class MethodDescriptions:
     def __init__(self):
         self._internal_index = []
         self._methods_by_name: Dict[EntityMethod] = {}
+        self._exposed_index_map = None
 
     def parse(self, section: etree.ElementBase, alias):
+        self._exposed_index_map = None
         for method in section:
             obj = EntityMethod.from_section(method, alias)
             if obj.get_name() in self._methods_by_name:
@@ -102,9 +174,15 @@ class MethodDescriptions:
             self._methods_by_name[obj.get_name()] = obj
 
     def get_exposed_index_map(self) -> List[EntityMethod]:
-        array = self._internal_index[:]
-        array.sort(key=lambda i: i.get_size_in_bytes())
-        return array
+        """
+        Methods ordered by exposed index, computed once
+        and shared by all callers, so it must not be modified
+        """
+        if self._exposed_index_map is None:
+            array = self._internal_index[:]
+            array.sort(key=lambda i: i.get_size_in_bytes())
+            self._exposed_index_map = array
+        return self._exposed_index_map
 
 
 class EntityDef(BaseDataObjectDef):
@@ -115,13 +193,13 @@ class EntityDef(BaseDataObjectDef):
     when the entities.xml file is parsed.
     """
 
-    def __init__(self, base_dir: str, name: str, section: etree.ElementBase, alias: Alias):
+    def __init__(self, scripts: Scripts, name: str, section: etree.ElementBase, alias: Alias):
         self._name = name
         self._cell_methods = MethodDescriptions()
         self._base_methods = MethodDescriptions()
         self._client_methods = MethodDescriptions()
 
-        super(EntityDef, self).__init__(base_dir, alias)
+        super(EntityDef, self).__init__(scripts, alias)
 
         self._parse_section(section)
 
@@ -0,0 +1,179 @@
+# coding=utf-8
+"""
+Content-addressed storage of definition scripts.
+
+Game versions share most of their .def files, so every file is stored
+once as definitions_store/<sha1> next to versions directory, and a version
+only keeps a manifest, which maps paths of its scripts to hashes.
+Versions with a plain scripts directory are supported as well.
+"""
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+SCRIPTS_DIR_NAME = 'scripts'
+MANIFEST_FILE_NAME = 'scripts.json'
+STORE_DIR_NAME = 'definitions_store'
+
+
+class Scripts:
+    """
+    Definition scripts of a version, addressed by paths
+    relative to version directory, e.g. scripts/entities.xml
+    """
+
+    def __init__(self, base_dir: str):
+        self._base_dir = base_dir
+        self._store_dir = get_store_dir(os.path.dirname(base_dir))
+        self._manifest = read_manifest(base_dir)
+        self._reads: Optional[List[Tuple[str, str]]] = None
+
+    def get_fingerprint(self) -> str:
+        """
+        Changes whenever any script changes
+        """
+        if self._manifest is not None:
+            # stored files are immutable, so manifest describes them all
+            return hashlib.sha1(json.dumps(self._manifest, sort_keys=True).encode()).hexdigest()
+
+        digest = hashlib.sha1()
+        for root, dirs, files in os.walk(os.path.join(self._base_dir, SCRIPTS_DIR_NAME)):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                digest.update(f'{os.path.relpath(path, self._base_dir)}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+        return digest.hexdigest()
+
+    def exists(self, path: str) -> bool:
+        if self._manifest is not None:
+            return path in self._manifest
+        return os.path.isfile(os.path.join(self._base_dir, path))
+
+    def get_hash(self, path: str) -> str:
+        if self._manifest is not None:
+            try:
+                return self._manifest[path]
+            except KeyError:
+                raise FileNotFoundError(os.path.join(self._base_dir, path))
+        with open(os.path.join(self._base_dir, path), 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def read(self, path: str) -> bytes:
+        if self._manifest is None:
+            real_path = os.path.join(self._base_dir, path)
+        else:
+            real_path = os.path.join(self._store_dir, self.get_hash(path))
+
+        with open(real_path, 'rb') as f:
+            data = f.read()
+        if self._reads is not None:
+            self._reads.append((path, hashlib.sha1(data).hexdigest()))
+        return data
+
+    def parse(self, path: str, **parser_options) -> etree.ElementBase:
+        """
+        Root element of xml script, parsed with given XMLParser options
+        """
+        parser = etree.XMLParser(**parser_options)
+        return etree.fromstring(self.read(path), parser=parser)
+
+    @contextmanager
+    def record_reads(self):
+        """
+        Collect (path, hash) of every script read inside the block,
+        that is everything parsed result depends on
+        """
+        reads = self._reads = []
+        try:
+            yield reads
+        finally:
+            self._reads = None
+
+    def __repr__(self):
+        return '<Scripts {}>'.format(self._base_dir)
+
+
+def get_store_dir(versions_dir: str) -> str:
+    """
+    Store shared by all versions in versions directory,
+    it is kept outside of it, so that versions directory has only versions
+    """
+    return os.path.join(os.path.dirname(os.path.normpath(versions_dir)), STORE_DIR_NAME)
+
+
+def read_manifest(base_dir: str) -> Optional[Dict[str, str]]:
+    try:
+        with open(os.path.join(base_dir, MANIFEST_FILE_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def pack_scripts(base_dir: str):
+    """
+    Move scripts directory of version into store and replace it with manifest
+    """
+    scripts_dir = os.path.join(base_dir, SCRIPTS_DIR_NAME)
+    store_dir = get_store_dir(os.path.dirname(base_dir))
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = {}
+    for root, dirs, files in os.walk(scripts_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha1(data).hexdigest()
+            stored_path = os.path.join(store_dir, digest)
+            if not os.path.exists(stored_path):
+                with open(stored_path, 'wb') as f:
+                    f.write(data)
+            manifest[os.path.relpath(path, base_dir).replace(os.sep, '/')] = digest
+
+    with open(os.path.join(base_dir, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.write('\n')
+    shutil.rmtree(scripts_dir)
+
+
+def unpack_scripts(base_dir: str):
+    """
+    Restore scripts directory of version from store, e.g. to edit or diff them
+    """
+    manifest = read_manifest(base_dir)
+    if manifest is None:
+        raise RuntimeError('%s has no %s' % (base_dir, MANIFEST_FILE_NAME))
+
+    store_dir = get_store_dir(os.path.dirname(base_dir))
+    for path, digest in manifest.items():
+        target = os.path.join(base_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(store_dir, digest), target)
+    os.remove(os.path.join(base_dir, MANIFEST_FILE_NAME))
+
+
+def prune_store(versions_dir: str) -> List[str]:
+    """
+    Remove stored files no manifest refers to, returns removed hashes
+    """
+    used = set()
+    for name in os.listdir(versions_dir):
+        if not os.path.isdir(os.path.join(versions_dir, name)):
+            continue
+        manifest = read_manifest(os.path.join(versions_dir, name))
+        if manifest is not None:
+            used.update(manifest.values())
+
+    store_dir = get_store_dir(versions_dir)
+    removed = []
+    for digest in sorted(os.listdir(store_dir)):
+        if digest not in used:
+            os.remove(os.path.join(store_dir, digest))
+            removed.append(digest)
+    return removed
@@ -1,6 +1,11 @@
 # coding=utf-8
 import struct
-from io import BytesIO
+from typing import Iterable, Iterator
+
+from .payload_reader import PayloadReader
+
+HEADER = struct.Struct('IIf')
+HEADER_SIZE = HEADER.size
 
 
 class NetPacket(object):
@@ -11,8 +16,49 @@ class NetPacket(object):
         self.type, = struct.unpack('I', stream.read(4))
         self.time, = struct.unpack('f', stream.read(4))
 
-        self.raw_data = BytesIO(stream.read(self.size))
+        self.raw_data = PayloadReader(stream.read(self.size))
+
+    @classmethod
+    def from_fields(cls, size, type_, time, payload):
+        """
+        Create packet whose header was already parsed, e.g. by PacketIndex or iter_packets;
+        payload may be a memoryview slice, it is not copied
+        """
+        packet = cls.__new__(cls)
+        packet.size = size
+        packet.type = type_
+        packet.time = time
+        packet.raw_data = PayloadReader(payload)
+        return packet
 
     def __repr__(self):
         return "TIME: {} TYPE: {} SIZE: {} DATA: {}".format(
             self.time, hex(self.type), self.size, self.raw_data)
+
+
+def iter_packets(chunks: Iterable[bytes]) -> Iterator[NetPacket]:
+    """
+    Frame packets out of decompressed replay data that arrives in chunks
+    of any size; each packet is yielded as soon as it is complete.
+    Payloads are views into the chunk, only a packet split
+    between two chunks is copied.
+    """
+    unpack_from = HEADER.unpack_from
+    pending = b''
+    for chunk in chunks:
+        data = memoryview(pending + chunk if pending else chunk)
+        end = len(data)
+        position = 0
+
+        while end - position >= HEADER_SIZE:
+            size, type_, time = unpack_from(data, position)
+            if end - position < HEADER_SIZE + size:
+                break
+            position += HEADER_SIZE
+            yield NetPacket.from_fields(size, type_, time, data[position:position + size])
+            position += size
+
+        pending = data[position:].tobytes()
+
+    if pending:
+        raise ValueError("Replay data ends with incomplete packet (%s bytes)" % len(pending))
@@ -0,0 +1,86 @@
+# coding=utf-8
+import struct
+from array import array
+from typing import Iterable, Iterator, Optional
+
+import numpy
+
+from .net_packet import NetPacket, HEADER_SIZE
+
+HEADER = struct.Struct('IIf')
+
+
+class PacketIndex(object):
+    """
+    Type, time, payload offset and size of every packet in decompressed
+    replay data, built in one pass over a memoryview without copying payloads.
+    Packets can then be filtered by type or time and framed any number of times.
+    """
+    __slots__ = ('data', 'types', 'times', 'offsets', 'sizes')
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+
+        types, times, offsets, sizes = array('I'), array('f'), array('Q'), array('I')
+        unpack_from = HEADER.unpack_from
+        end = len(self.data)
+        position = 0
+        while position < end:
+            size, type_, time = unpack_from(self.data, position)
+            position += HEADER_SIZE
+            types.append(type_)
+            times.append(time)
+            offsets.append(position)
+            sizes.append(size)
+            position += size
+
+        if position != end:
+            raise ValueError("Replay data ends with incomplete packet")
+
+        self.types = numpy.frombuffer(types, dtype=numpy.uint32)
+        self.times = numpy.frombuffer(times, dtype=numpy.float32)
+        self.offsets = numpy.frombuffer(offsets, dtype=numpy.uint64)
+        self.sizes = numpy.frombuffer(sizes, dtype=numpy.uint32)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __iter__(self) -> Iterator[NetPacket]:
+        return self.iter_packets()
+
+    def select(self, types: Optional[Iterable[int]] = None,
+               start: Optional[float] = None, end: Optional[float] = None) -> numpy.ndarray:
+        """
+        Indexes of packets of given types within [start, end) game time
+        """
+        mask = numpy.ones(len(self), dtype=bool)
+        if types is not None:
+            mask &= numpy.isin(self.types, list(types))
+        if start is not None:
+            mask &= self.times >= start
+        if end is not None:
+            mask &= self.times < end
+        return numpy.flatnonzero(mask)
+
+    def payload(self, index: int) -> memoryview:
+        offset = int(self.offsets[index])
+        return self.data[offset:offset + int(self.sizes[index])]
+
+    def packet(self, index: int) -> NetPacket:
+        return NetPacket.from_fields(int(self.sizes[index]), int(self.types[index]),
+                                     float(self.times[index]), self.payload(index))
+
+    def iter_packets(self, indexes: Optional[Iterable[int]] = None) -> Iterator[NetPacket]:
+        """
+        Frame packets at given indexes, all of them by default;
+        result can be passed to PlayerBase.play
+        """
+        sizes, types, times, offsets = self.sizes, self.types, self.times, self.offsets
+        if indexes is not None:
+            indexes = numpy.asarray(indexes, dtype=numpy.intp)
+            sizes, types, times, offsets = sizes[indexes], types[indexes], times[indexes], offsets[indexes]
+
+        # plain ints and floats are much cheaper to handle than NumPy scalars
+        data, from_fields = self.data, NetPacket.from_fields
+        for size, type_, time, offset in zip(sizes.tolist(), types.tolist(), times.tolist(), offsets.tolist()):
+            yield from_fields(size, type_, time, data[offset:offset + size])
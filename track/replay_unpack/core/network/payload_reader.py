@@ -0,0 +1,46 @@
+# coding=utf-8
+import os
+import struct
+
+
+class PayloadReader(object):
+    """
+    BytesIO-like cursor over a memoryview of replay data.
+    read() returns slices of the underlying buffer instead of copies,
+    unpack() decodes in place with a precompiled struct.Struct.
+    """
+    __slots__ = ('_view', '_position')
+
+    def __init__(self, data):
+        self._view = data if isinstance(data, memoryview) else memoryview(data)
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def read(self, size: int = -1) -> memoryview:
+        start = self._position
+        end = len(self._view)
+        if size is not None and 0 <= size < end - start:
+            end = start + size
+        self._position = end
+        return self._view[start:end]
+
+    def unpack(self, struct_: struct.Struct) -> tuple:
+        values = struct_.unpack_from(self._view, self._position)
+        self._position += struct_.size
+        return values
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def getvalue(self) -> bytes:
+        return self._view.tobytes()
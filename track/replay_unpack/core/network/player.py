@@ -2,9 +2,10 @@
 # coding=utf-8
 import logging
 from abc import ABC
-from io import BytesIO
+from typing import Iterable, Union
 
-from .net_packet import NetPacket
+from .net_packet import NetPacket, iter_packets
+from .packet_index import PacketIndex
 
 
 class PlayerBase:
@@ -25,15 +26,32 @@ class PlayerBase:
         logging.info('unknown packet %s', hex(packet.type))
         return None
 
+    def _is_packet_needed(self, packet: NetPacket) -> bool:
+        """
+        Skipped packets are not deserialized, they are
+        passed to _process_packet as None to keep time going
+        """
+        return True
+
     def _process_packet(self, packet, time):
         raise NotImplementedError
 
-    def play(self, replay_data, strict_mode=False):
-        io = BytesIO(replay_data)
-        while io.tell() != len(replay_data):
-            packet = NetPacket(io)
+    def play(self, replay_data: Union[bytes, PacketIndex, Iterable[NetPacket]], strict_mode=False):
+        """
+        Play decompressed replay data, or packets that are
+        already framed, e.g. a streaming reader's iter_packets.
+        PacketIndex of replay data frames it once, so the same replay
+        can be played by any number of players without framing it again.
+        """
+        if isinstance(replay_data, (bytes, bytearray)):
+            replay_data = iter_packets([replay_data])
+
+        for packet in replay_data:
             try:
-                self._process_packet(self._deserialize_packet(packet), packet.time)
+                if self._is_packet_needed(packet):
+                    self._process_packet(self._deserialize_packet(packet), packet.time)
+                else:
+                    self._process_packet(None, packet.time)
             except Exception:
                 logging.exception("Problem with packet %s:%s:%s",
                                   packet.time, packet.type, self._mapping.get(packet.type))
@@ -52,3 +70,17 @@ class ControlledPlayerBase(PlayerBase, ABC):
 
     def get_info(self):
         return self._battle_controller.get_info()
+
+    def close(self):
+        """
+        Release controller's entity callbacks once replay is played,
+        get_info still works after it
+        """
+        if self._battle_controller.subscriptions is not None:
+            self._battle_controller.subscriptions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,8 +1,10 @@
 # coding=utf-8
 import struct
-from io import BytesIO as StringIO
 
 from replay_unpack.core import PrettyPrintObjectMixin
+from ..payload_reader import PayloadReader
+
+LENGTH = struct.Struct('=I')
 
 
 class BinaryStream(PrettyPrintObjectMixin):
@@ -12,8 +14,9 @@ class BinaryStream(PrettyPrintObjectMixin):
     )
 
     def __init__(self, stream):
-        self._length, = struct.unpack('I', stream.read(4))
+        self._length, = stream.unpack(LENGTH)
+        # a view into packet payload, see PayloadReader
         self.value = stream.read(self._length)
 
     def io(self):
-        return StringIO(self.value)
+        return PayloadReader(self.value)
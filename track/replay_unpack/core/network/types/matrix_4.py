@@ -3,6 +3,8 @@ import struct
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+MATRIX4 = struct.Struct('=16f')
+
 
 class Matrix4(PrettyPrintObjectMixin):
     __slots__ = [
@@ -13,19 +15,7 @@ class Matrix4(PrettyPrintObjectMixin):
     ]
 
     def __init__(self, stream):
-        self.m11, = struct.unpack('f', stream.read(4))
-        self.m12, = struct.unpack('f', stream.read(4))
-        self.m13, = struct.unpack('f', stream.read(4))
-        self.m14, = struct.unpack('f', stream.read(4))
-        self.m21, = struct.unpack('f', stream.read(4))
-        self.m22, = struct.unpack('f', stream.read(4))
-        self.m23, = struct.unpack('f', stream.read(4))
-        self.m24, = struct.unpack('f', stream.read(4))
-        self.m31, = struct.unpack('f', stream.read(4))
-        self.m32, = struct.unpack('f', stream.read(4))
-        self.m33, = struct.unpack('f', stream.read(4))
-        self.m34, = struct.unpack('f', stream.read(4))
-        self.m41, = struct.unpack('f', stream.read(4))
-        self.m42, = struct.unpack('f', stream.read(4))
-        self.m43, = struct.unpack('f', stream.read(4))
-        self.m44, = struct.unpack('f', stream.read(4))
+        (self.m11, self.m12, self.m13, self.m14,
+         self.m21, self.m22, self.m23, self.m24,
+         self.m31, self.m32, self.m33, self.m34,
+         self.m41, self.m42, self.m43, self.m44) = stream.unpack(MATRIX4)
@@ -3,6 +3,8 @@ import struct
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+VECTOR3 = struct.Struct('=3f')
+
 
 class Vector3(PrettyPrintObjectMixin):
     __slots__ = (
@@ -10,6 +12,13 @@ class Vector3(PrettyPrintObjectMixin):
     )
 
     def __init__(self, stream):
-        self.x, = struct.unpack('f', stream.read(4))
-        self.y, = struct.unpack('f', stream.read(4))
-        self.z, = struct.unpack('f', stream.read(4))
+        self.x, self.y, self.z = stream.unpack(VECTOR3)
+
+    @classmethod
+    def from_values(cls, x, y, z):
+        """
+        Create vector from values a packet struct already unpacked
+        """
+        vector = cls.__new__(cls)
+        vector.x, vector.y, vector.z = x, y, z
+        return vector
@@ -4,6 +4,8 @@ import struct
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import BinaryStream
 
+BASE_PLAYER_CREATE = struct.Struct('=ih')
+
 
 class BasePlayerCreate(PrettyPrintObjectMixin):
     """
@@ -14,7 +16,6 @@ class BasePlayerCreate(PrettyPrintObjectMixin):
     """
 
     def __init__(self, stream):
-        self.entityId, = struct.unpack('i', stream.read(4))
-        self.entityType, = struct.unpack('h', stream.read(2))
+        self.entityId, self.entityType = stream.unpack(BASE_PLAYER_CREATE)
 
         self.value = BinaryStream(stream)
@@ -3,7 +3,9 @@ import struct
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+ENTITY_CONTROL = struct.Struct('=ib')
+
 
 class EntityControl(PrettyPrintObjectMixin):
     def __init__(self, stream):
-        self.entityId, self.isControled = struct.unpack('ib', stream.read(5))
+        self.entityId, self.isControled = stream.unpack(ENTITY_CONTROL)
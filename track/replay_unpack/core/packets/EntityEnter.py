@@ -3,6 +3,8 @@ import struct
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+ENTITY_ENTER = struct.Struct('=3i')
+
 
 class EntityEnter(PrettyPrintObjectMixin):
     """
@@ -11,5 +13,4 @@ class EntityEnter(PrettyPrintObjectMixin):
     """
 
     def __init__(self, stream):
-        self.entityId, self.spaceId, self.vehicleID = \
-            struct.unpack('iii', stream.read(12))
+        self.entityId, self.spaceId, self.vehicleID = stream.unpack(ENTITY_ENTER)
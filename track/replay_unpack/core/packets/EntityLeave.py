@@ -3,6 +3,8 @@ import struct
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+ENTITY_LEAVE = struct.Struct('=i')
+
 
 class EntityLeave(PrettyPrintObjectMixin):
     """
@@ -11,4 +13,4 @@ class EntityLeave(PrettyPrintObjectMixin):
     """
 
     def __init__(self, stream):
-        self.entityId, = struct.unpack('i', stream.read(4))
+        self.entityId, = stream.unpack(ENTITY_LEAVE)
@@ -4,6 +4,8 @@ import struct
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import BinaryStream
 
+ENTITY_METHOD = struct.Struct('=2I')
+
 
 class EntityMethod(PrettyPrintObjectMixin):
     """
@@ -17,7 +19,6 @@ class EntityMethod(PrettyPrintObjectMixin):
     )
 
     def __init__(self, stream):
-        self.entityId, = struct.unpack('I', stream.read(4))
-        self.messageId, = struct.unpack('I', stream.read(4))
+        self.entityId, self.messageId = stream.unpack(ENTITY_METHOD)
 
         self.data = BinaryStream(stream)
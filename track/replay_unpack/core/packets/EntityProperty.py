@@ -4,6 +4,8 @@ import struct
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import BinaryStream
 
+ENTITY_PROPERTY = struct.Struct('=2I')
+
 
 class EntityProperty(PrettyPrintObjectMixin):
     """
@@ -17,6 +19,5 @@ class EntityProperty(PrettyPrintObjectMixin):
     )
 
     def __init__(self, stream):
-        self.objectID, = struct.unpack('I', stream.read(4))
-        self.messageId, = struct.unpack('I', stream.read(4))
+        self.objectID, self.messageId = stream.unpack(ENTITY_PROPERTY)
         self.data = BinaryStream(stream)
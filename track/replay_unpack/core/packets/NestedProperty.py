@@ -1,27 +1,100 @@
 # coding=utf-8
 import logging
 import struct
-from io import BytesIO
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from replay_unpack.core import Entity
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.entity_def.bit_reader import BitReader
+from replay_unpack.core.entity_def.data_types import get_decoder
 from replay_unpack.core.entity_def.data_types.nested_types import PyFixedDict, PyFixedList
+from replay_unpack.core.network.payload_reader import PayloadReader
+
+NESTED_PROPERTY_HEADER = struct.Struct('=Ibb3s')
+
+
+class NestedPath(NamedTuple):
+    """
+    Resolved path of nested property update
+    """
+    # size of path in payload, value starts after it
+    header_size: int
+    # property name, then field names and list indexes down to updated object
+    keys: Tuple
+    # lengths of updated object and objects above it, bit widths of path depend on them
+    lengths: Tuple[int, ...]
+    # field or list index in updated object
+    index1: int
+    # end of replaced slice
+    index2: Optional[int]
+
+
+class NestedPathCache:
+    """
+    Resolved paths of one replay, so that repeated updates of same field
+    are not walked bit by bit. It is owned by the player, paths depend on
+    definitions of its version and are dropped together with it.
+    """
+    __slots__ = ('paths', 'header_sizes')
+
+    def __init__(self):
+        # resolved paths by entity type, slice flag and path bytes
+        self.paths: Dict[Tuple[str, bool, bytes], NestedPath] = {}
+        # sizes of path bytes seen by entity type and slice flag
+        self.header_sizes: Dict[Tuple[str, bool], List[int]] = {}
+
+    def find(self, key: Tuple[str, bool], payload) -> Iterator[NestedPath]:
+        for header_size in self.header_sizes.get(key, ()):
+            path = self.paths.get(key + (bytes(payload[:header_size]),))
+            if path is not None:
+                yield path
+
+    def add(self, key: Tuple[str, bool], payload, path: NestedPath):
+        self.paths[key + (bytes(payload[:path.header_size]),)] = path
+        if path.header_size not in self.header_sizes.setdefault(key, []):
+            self.header_sizes[key].append(path.header_size)
 
 
 class NestedProperty(PrettyPrintObjectMixin):
     def __init__(self, stream):
-        self.entity_id, = struct.unpack('I', stream.read(4))
-        self.is_slice = struct.unpack('b', stream.read(1))[0] == 1
-        self.payload_size, = struct.unpack('b', stream.read(1))
-
-        self.u = stream.read(3)  # unknown
+        # u is unknown
+        self.entity_id, is_slice, self.payload_size, self.u = stream.unpack(NESTED_PROPERTY_HEADER)
+        self.is_slice = is_slice == 1
         self.payload = stream.read()
         assert len(self.payload) == self.payload_size
 
-    def read_and_apply(self, entity):
+    def read_and_apply(self, entity, cache: Optional[NestedPathCache] = None):
+        found = None if cache is None else self._find_path(entity, cache)
+        if found is None:
+            path, obj = self._resolve_path(entity)
+            if cache is not None:
+                cache.add((entity.get_name(), self.is_slice), self.payload, path)
+        else:
+            path, obj = found
+
+        self._apply(obj, path, self.payload[path.header_size:])
+
+    def _find_path(self, entity, cache: NestedPathCache):
+        """
+        Cached path for payload, if objects along it
+        still have lengths path was resolved with
+        """
+        for path in cache.find((entity.get_name(), self.is_slice), self.payload):
+            obj = entity.properties['client'].get(path.keys[0])
+            for item, length in zip(path.keys[1:], path.lengths):
+                if not isinstance(obj, (PyFixedDict, PyFixedList)) or len(obj) != length:
+                    return None
+                obj = obj[item]
+            if not isinstance(obj, (PyFixedDict, PyFixedList)) or len(obj) != path.lengths[-1]:
+                return None
+            return path, obj
+        return None
+
+    def _resolve_path(self, entity):
         bit_reader = BitReader(self.payload)
         obj = entity
+        keys = []
+        lengths = []
 
         while bit_reader.get(1) and obj:
             l = len(obj.client_properties) if isinstance(obj, Entity) else len(obj)
@@ -29,6 +102,7 @@ class NestedProperty(PrettyPrintObjectMixin):
             property_id = bit_reader.get(max_bits)
             if hasattr(obj, 'get_field_name_for_index'):
                 field = obj.get_field_name_for_index(property_id)
+                lengths.append(l)
                 obj = obj[field]
             elif isinstance(obj, Entity):
                 field = obj.client_properties[property_id].get_name()
@@ -36,21 +110,17 @@ class NestedProperty(PrettyPrintObjectMixin):
                 obj = obj.properties['client'][field]
             else:
                 raise NotImplementedError
+            keys.append(field)
             logging.debug('next path item: %s(%s)', field, property_id)
 
         logging.debug('object: %s %s', obj, type(obj))
 
+        index2 = None
         if isinstance(obj, PyFixedDict):
             assert self.is_slice is False
             max_bits = BitReader.bits_required(len(obj))
             index1 = bit_reader.get(max_bits)
 
-            field = obj.get_field_name_for_index(index1)
-            logging.debug('old obj[%s] = %s', field, obj[field])
-            obj[field] = obj.get_field_type_for_index(index1). \
-                create_from_stream(BytesIO(bit_reader.get_rest()))
-            logging.debug('new obj[%s] = %s', field, obj[field])
-
         elif isinstance(obj, PyFixedList):
             if self.is_slice:
                 max_bits = BitReader.bits_required(len(obj) + 1)
@@ -63,32 +133,45 @@ class NestedProperty(PrettyPrintObjectMixin):
                 index2 = bit_reader.get(max_bits)
                 logging.debug('Slice index: %s', index2)
 
-            rest = bit_reader.get_rest()
-            if not rest:
-                logging.debug('empty response, bytes read %s', bit_reader.bytes_read)
-                if self.is_slice:
-                    logging.debug('removing element %s', obj[index1:index2])
-                    obj[index1:index2] = []
-                else:
-                    obj[index1] = None
-                return
-            io = BytesIO(rest)
-            new_elements = []
-            # read elements unless io is empty, sizes should match
-            while io.tell() != len(rest):
-                t = obj.get_element_type().create_from_stream(io)
-                logging.debug('Bytes left in io: %s of %s', io.tell(), len(rest))
-                new_elements.append(t)
-            assert io.tell() == len(rest)
-            logging.debug('old list object: %s', obj)
+        else:
+            raise NotImplementedError(type(obj))
+
+        lengths.append(len(obj))
+        return NestedPath(bit_reader.bytes_read, tuple(keys), tuple(lengths), index1, index2), obj
+
+    def _apply(self, obj, path: NestedPath, rest):
+        if isinstance(obj, PyFixedDict):
+            field = obj.get_field_name_for_index(path.index1)
+            logging.debug('old obj[%s] = %s', field, obj[field])
+            decode = get_decoder(obj.get_field_type_for_index(path.index1))
+            obj[field] = decode(PayloadReader(rest))
+            logging.debug('new obj[%s] = %s', field, obj[field])
+            return
 
+        index1, index2 = path.index1, path.index2
+        if not rest:
+            logging.debug('empty response, bytes read %s', path.header_size)
             if self.is_slice:
-                logging.debug("replacing %s:%s with %s", index1, index2, new_elements)
-                obj[index1:index2] = new_elements
+                logging.debug('removing element %s', obj[index1:index2])
+                obj[index1:index2] = []
             else:
-                logging.debug("setting %s with %s", index1, new_elements[0])
-                obj[index1] = new_elements[0]
-            logging.debug('new list object: %s', obj)
+                obj[index1] = None
+            return
+        io = PayloadReader(rest)
+        new_elements = []
+        decode = get_decoder(obj.get_element_type())
+        # read elements unless io is empty, sizes should match
+        while io.tell() != len(rest):
+            t = decode(io)
+            logging.debug('Bytes left in io: %s of %s', io.tell(), len(rest))
+            new_elements.append(t)
+        assert io.tell() == len(rest)
+        logging.debug('old list object: %s', obj)
 
+        if self.is_slice:
+            logging.debug("replacing %s:%s with %s", index1, index2, new_elements)
+            obj[index1:index2] = new_elements
         else:
-            raise NotImplementedError(type(obj))
+            logging.debug("setting %s with %s", index1, new_elements[0])
+            obj[index1] = new_elements[0]
+        logging.debug('new list object: %s', obj)
@@ -1,10 +1,11 @@
 # coding=utf-8
 import struct
-from io import BytesIO as StringIO
 
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import Vector3
 
+POSITION = struct.Struct('=2i3f3f3fb')
+
 
 class Position(PrettyPrintObjectMixin):
     __slots__ = (
@@ -19,12 +20,9 @@ class Position(PrettyPrintObjectMixin):
     )
 
     def __init__(self, stream):
-        # type: (StringIO) -> ()
-        self.entityId, = struct.unpack('i', stream.read(4))
-        self.vehicleId, = struct.unpack('i', stream.read(4))
-        self.position = Vector3(stream)
-        self.positionError = Vector3(stream)
-        self.yaw, = struct.unpack('f', stream.read(4))
-        self.pitch, = struct.unpack('f', stream.read(4))
-        self.roll, = struct.unpack('f', stream.read(4))
-        self.is_error, = struct.unpack('b', stream.read(1))
+        # type: (PayloadReader) -> ()
+        (self.entityId, self.vehicleId,
+         x, y, z, error_x, error_y, error_z,
+         self.yaw, self.pitch, self.roll, self.is_error) = stream.unpack(POSITION)
+        self.position = Vector3.from_values(x, y, z)
+        self.positionError = Vector3.from_values(error_x, error_y, error_z)
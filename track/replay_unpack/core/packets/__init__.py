@@ -10,7 +10,7 @@ from .EntityLeave import EntityLeave
 from .EntityMethod import EntityMethod
 from .EntityProperty import EntityProperty
 from .Map import Map
-from .NestedProperty import NestedProperty
+from .NestedProperty import NestedPathCache, NestedProperty
 from .Position import Position
 
 __all__ = [
@@ -26,4 +26,5 @@ __all__ = [
     'EntityProperty',
     'CellPlayerCreate',
     'NestedProperty',
+    'NestedPathCache',
 ]
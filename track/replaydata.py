@@ -1,3 +1,12 @@
+import array
+import bisect
+from collections.abc import Mapping
+from copy import deepcopy
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy
+
+
 class MatchData:
     pass
 
@@ -37,3 +46,295 @@ class PlayerState:
             self.yaw = yaw
 
 
+class PlayerStateHistory(Mapping):
+    """
+    Player states sampled over time by PlayerStateEvents.sample, stored as
+    (ticks, players) array per field instead of copies of PlayerState objects.
+    Reads like dict of time -> list of PlayerState, as timedPlayerStates did.
+    """
+    # isVisible is None until first minimap update, it is stored as -1
+    FIELDS = (
+        ('x', numpy.float64),
+        ('y', numpy.float64),
+        ('yaw', numpy.float64),
+        ('health', numpy.float64),
+        ('isAlive', numpy.bool_),
+        ('isVisible', numpy.int8),
+        ('isAbuser', numpy.bool_),
+    )
+
+    def __init__(self, identities, times, counts, columns):
+        # id, avatarId, vehicleId by slot, they never change
+        self._identities: List[Tuple[int, int, int]] = list(identities)
+        self._times: List[float] = list(times)
+        self._ticks: Dict[float, int] = {time: tick for tick, time in enumerate(self._times)}
+        # players that existed at each tick, later ones are appended
+        self._counts = numpy.asarray(counts, numpy.int32)
+        self._columns: Dict[str, numpy.ndarray] = dict(columns)
+
+    def get_times(self) -> numpy.ndarray:
+        return numpy.array(self._times)
+
+    def get_column(self, name) -> numpy.ndarray:
+        """
+        Sampled values of field as (ticks, players) array,
+        slots of players that did not exist yet hold default values
+        """
+        return self._columns[name]
+
+    # Mapping of time -> list of PlayerState
+
+    def __getitem__(self, time) -> List[PlayerState]:
+        tick = self._ticks[time]
+        rows = {name: self._columns[name][tick, :self._counts[tick]].tolist() for name, _ in self.FIELDS}
+        states = []
+        for slot, (id_, avatar_id, vehicle_id) in enumerate(self._identities[:self._counts[tick]]):
+            ps = PlayerState()
+            ps.id = id_
+            ps.avatarId = avatar_id
+            ps.vehicleId = vehicle_id
+            ps.isAbuser = rows['isAbuser'][slot]
+            ps.isAlive = rows['isAlive'][slot]
+            ps.health = rows['health'][slot]
+            ps.x = rows['x'][slot]
+            ps.y = rows['y'][slot]
+            ps.yaw = rows['yaw'][slot]
+            is_visible = rows['isVisible'][slot]
+            ps.isVisible = None if is_visible == -1 else bool(is_visible)
+            states.append(ps)
+        return states
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._times)
+
+    def __len__(self):
+        return len(self._times)
+
+
+class PlayerStateEvents:
+    """
+    Every change of player states as (time, slot, field, value) event,
+    stored in compact arrays. States are sampled from events on demand,
+    so consumers choose their own sample times after parsing.
+    """
+    FIELD_NAMES = tuple(name for name, _ in PlayerStateHistory.FIELDS)
+    FIELD_INDEXES = {name: field for field, name in enumerate(FIELD_NAMES)}
+    # values of player state before any event, isVisible None is -1
+    DEFAULTS = tuple(-1.0 if name == 'isVisible' else 0.0 for name in FIELD_NAMES)
+
+    def __init__(self):
+        # id, avatarId, vehicleId by slot and times players were added at
+        self._identities: List[Tuple[int, int, int]] = []
+        self._added: List[float] = []
+        # events, appending to array.array is cheap and it keeps values unboxed
+        self._times = array.array('d')
+        self._slots = array.array('i')
+        self._fields = array.array('b')
+        self._values = array.array('d')
+        # latest value of every field by slot, so that only changes are recorded
+        self._current: List[List[float]] = [[] for _ in self.FIELD_NAMES]
+
+    def add_player(self, time, id_, avatar_id, vehicle_id) -> int:
+        slot = len(self._identities)
+        for values, default in zip(self._current, self.DEFAULTS):
+            values.append(default)
+        self._identities.append((id_, avatar_id, vehicle_id))
+        self._added.append(time)
+        return slot
+
+    def get_id(self, slot) -> int:
+        return self._identities[slot][0]
+
+    def get_players_count(self) -> int:
+        return len(self._identities)
+
+    def __len__(self):
+        return len(self._times)
+
+    def set_value(self, time, slot, name, value):
+        if name == 'isVisible':
+            value = -1 if value is None else value
+        field = self.FIELD_INDEXES[name]
+        if self._current[field][slot] == value:
+            return
+        self._current[field][slot] = value
+
+        self._times.append(time)
+        self._slots.append(slot)
+        self._fields.append(field)
+        self._values.append(value)
+
+    def set_position(self, time, slot, x, y, yaw):
+        # same rule as PlayerState.setPosition, hidden ships keep last position
+        is_visible = x != -2500.0 and y != -2500.0
+        self.set_value(time, slot, 'isVisible', is_visible)
+        if is_visible:
+            self.set_value(time, slot, 'x', x)
+            self.set_value(time, slot, 'y', y)
+            self.set_value(time, slot, 'yaw', yaw)
+
+    def set_positions(self, time, slots, x, y, yaw):
+        """
+        set_position for arrays of slots and coordinates at once,
+        if slot repeats, its last position wins
+        """
+        slots = numpy.asarray(slots)
+        is_visible = (x != -2500.0) & (y != -2500.0)
+        self._set_values(time, slots, 'isVisible', is_visible)
+        slots = slots[is_visible]
+        self._set_values(time, slots, 'x', x[is_visible])
+        self._set_values(time, slots, 'y', y[is_visible])
+        self._set_values(time, slots, 'yaw', yaw[is_visible])
+
+    def _set_values(self, time, slots, name, values):
+        field = self.FIELD_INDEXES[name]
+        current = self._current[field]
+        changed_slots, changed_values = [], []
+        for slot, value in zip(slots.tolist(), values.tolist()):
+            if current[slot] != value:
+                current[slot] = value
+                changed_slots.append(slot)
+                changed_values.append(value)
+
+        self._times.extend([time] * len(changed_slots))
+        self._slots.extend(changed_slots)
+        self._fields.extend([field] * len(changed_slots))
+        self._values.extend(changed_values)
+
+    def sample(self, times) -> PlayerStateHistory:
+        """
+        Player states at given times, as they were before events of that time
+        """
+        times = numpy.asarray(times, numpy.float64)
+        players = len(self._identities)
+        event_times = numpy.frombuffer(self._times, numpy.float64)
+        slots = numpy.frombuffer(self._slots, numpy.intc)
+        fields = numpy.frombuffer(self._fields, numpy.int8)
+        values = numpy.frombuffer(self._values, numpy.float64)
+
+        # group events by field and slot in time order,
+        # events of same time stay in order they were recorded
+        keys = fields.astype(numpy.int64) * max(players, 1) + slots
+        order = numpy.lexsort((event_times, keys))
+        keys, event_times, values = keys[order], event_times[order], values[order]
+
+        columns = {}
+        for field, (name, dtype) in enumerate(PlayerStateHistory.FIELDS):
+            column = numpy.full((len(times), players), self.DEFAULTS[field])
+            for slot in range(players):
+                key = field * max(players, 1) + slot
+                start, end = numpy.searchsorted(keys, (key, key + 1))
+                if start == end:
+                    continue
+                # last event before each sample time
+                index = numpy.searchsorted(event_times[start:end], times) - 1
+                column[:, slot] = numpy.where(index >= 0, values[start:end][index], self.DEFAULTS[field])
+            columns[name] = column.astype(dtype)
+
+        counts = numpy.searchsorted(numpy.array(self._added, numpy.float64), times)
+        return PlayerStateHistory(self._identities, times.tolist(), counts, columns)
+
+
+class CapsHistory(Mapping):
+    """
+    Capture points sampled over time. Whole state is stored only when
+    caps appear or disappear, otherwise just fields that changed since
+    previous sample, as caps stay the same most of the battle.
+    Reads like dict of time -> list of caps, as caps_history did.
+    """
+
+    def __init__(self):
+        self._times: List[float] = []
+        self._ticks: Dict[float, int] = {}
+        # whole state of caps and ticks of it
+        self._keyframes: List[List[dict]] = []
+        self._keyframe_ticks: List[int] = []
+        # (tick, cap index, field, value) and ticks of them for bisect
+        self._changes: List[Tuple[int, int, str, object]] = []
+        self._change_ticks: List[int] = []
+        # state at last sample, to find changed fields
+        self._last: List[dict] = []
+        self._cursor: Optional[CapsCursor] = None
+
+    def record(self, time, caps):
+        tick = len(self._times)
+        self._times.append(time)
+        self._ticks[time] = tick
+
+        if not self._keyframes or len(caps) != len(self._last):
+            self._last = [{name: deepcopy(value) for name, value in cap.items()} for cap in caps]
+            self._keyframes.append(deepcopy(self._last))
+            self._keyframe_ticks.append(tick)
+            return
+
+        for index, (cap, last) in enumerate(zip(caps, self._last)):
+            for name, value in cap.items():
+                if name in last and last[name] == value:
+                    continue
+                # changed values are replaced, never modified, so they are shared with _last
+                value = last[name] = deepcopy(value)
+                self._changes.append((tick, index, name, value))
+                self._change_ticks.append(tick)
+
+    def cursor(self) -> 'CapsCursor':
+        return CapsCursor(self)
+
+    # Mapping of time -> list of caps
+
+    def __getitem__(self, time) -> List[dict]:
+        if time not in self._ticks:
+            raise KeyError(time)
+        if self._cursor is None:
+            self._cursor = self.cursor()
+        return [dict(cap) for cap in self._cursor.seek(time)]
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._times)
+
+    def __len__(self):
+        return len(self._times)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cursor'] = None
+        return state
+
+
+class CapsCursor:
+    """
+    Replays changes of CapsHistory, seeking forward only applies
+    changes since previous position, so reading every sample in order
+    costs about the same as reading one
+    """
+
+    def __init__(self, history: CapsHistory):
+        self._history = history
+        self._tick = -1
+        self._keyframe = -1
+        self._change = 0
+        self._state: List[dict] = []
+
+    def seek(self, time) -> List[dict]:
+        """
+        Caps as they were at given time, that is at last sample not after it.
+        Returned list is updated in place by following seeks
+        """
+        history = self._history
+        tick = bisect.bisect_right(history._times, time) - 1
+        keyframe = bisect.bisect_right(history._keyframe_ticks, tick) - 1
+        if tick < self._tick or keyframe != self._keyframe:
+            self._keyframe = keyframe
+            if keyframe < 0:
+                self._state = []
+                self._tick = tick
+                return self._state
+            self._state = [dict(cap) for cap in history._keyframes[keyframe]]
+            self._change = bisect.bisect_left(history._change_ticks, history._keyframe_ticks[keyframe])
+
+        changes = history._changes
+        while self._change < len(changes) and changes[self._change][0] <= tick:
+            _, index, name, value = changes[self._change]
+            self._state[index][name] = value
+            self._change += 1
+        self._tick = tick
+        return self._state
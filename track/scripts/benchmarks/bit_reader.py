@@ -0,0 +1,104 @@
+"""
+Compares BitReader with the previous reader, which expanded every byte
+into a list of bits, on payloads shaped like nested property updates.
+
+Usage: python bit_reader.py [iterations]
+"""
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.core.entity_def.bit_reader import BitReader  # noqa: E402
+from replay_unpack.core.network.payload_reader import PayloadReader  # noqa: E402
+
+ITERATIONS = 50000
+# (path depth, bits per path item, bytes of value after the path)
+PAYLOADS = [
+    (1, 5, 4),
+    (3, 6, 12),
+    (6, 7, 64),
+]
+
+
+class ByteListBitReader:
+    """
+    Previous implementation, kept here as a reference
+    """
+
+    def __init__(self, data):
+        self._stream = PayloadReader(data)
+        self._bits_cache = []
+        self._read_bits = 0
+
+    def get_rest(self):
+        return self._stream.read()
+
+    def _get_next_bit(self):
+        if not self._bits_cache:
+            next_byte = self._stream.read(1)
+            self._bits_cache = [(b >> i) & 1 for b in next_byte for i in reversed(range(8))]
+        self._read_bits += 1
+        return self._bits_cache.pop(0)
+
+    def get(self, nbits):
+        value = 0
+        while nbits > 0:
+            value = (value << 1) | self._get_next_bit()
+            nbits -= 1
+        return value
+
+
+def build_payload(depth, bits, value_size, rnd):
+    """
+    Path items as written by the server: continue flag,
+    then index, then zero flag, field index and the value
+    """
+    fields = []
+    for _ in range(depth):
+        fields += [(1, 1), (bits, rnd.getrandbits(bits))]
+    fields += [(1, 0), (bits, rnd.getrandbits(bits))]
+
+    value, size = 0, 0
+    for nbits, field in fields:
+        value = (value << nbits) | field
+        size += nbits
+    padding = -size % 8
+    header = (value << padding).to_bytes((size + padding) // 8, 'big')
+    return header + bytes(rnd.getrandbits(8) for _ in range(value_size)), fields
+
+
+def read(reader_class, payload, bits):
+    reader = reader_class(payload)
+    values = []
+    while reader.get(1):
+        values.append(reader.get(bits))
+    values.append(reader.get(bits))
+    return values, bytes(reader.get_rest())
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS
+    rnd = random.Random(0)
+
+    # bit widths were computed with float log before
+    for length in range(1, 1 << 16):
+        assert BitReader.bits_required(length) == int(math.ceil(math.log(length, 2))), length
+
+    for depth, bits, value_size in PAYLOADS:
+        payload, fields = build_payload(depth, bits, value_size, rnd)
+        result = read(BitReader, payload, bits)
+        assert result == read(ByteListBitReader, payload, bits), 'readers disagree'
+        assert result[0] == [field for nbits, field in fields if nbits == bits]
+
+        old_time = min(timeit.repeat(lambda: read(ByteListBitReader, payload, bits), number=iterations, repeat=3))
+        new_time = min(timeit.repeat(lambda: read(BitReader, payload, bits), number=iterations, repeat=3))
+        print(f'depth {depth}, {len(payload)} bytes: byte list {old_time / iterations * 1e6:.2f} us, '
+              f'int {new_time / iterations * 1e6:.2f} us, {old_time / new_time:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares bulk and blockwise replay decryption of utils.ReplayReader
+and of replay_unpack.replay_reader.ReplayReader.
+
+Usage: python decrypt.py [replay.wowsreplay ...]
+Without arguments, synthetic replays of 5 to 40 MB are generated.
+"""
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy
+from Crypto.Cipher import Blowfish
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.replay_reader import ReplayReader as PathReplayReader  # noqa: E402
+from utils.classes import ReplayReader, REPLAY_SIGNATURE, BLOWFISH_KEY  # noqa: E402
+
+SIZES_MB = (5, 10, 20, 40)
+
+
+def build_replay(size):
+    """
+    Builds a replay whose encrypted payload is about `size` bytes.
+    """
+    compressed = zlib.compress(os.urandom(size), 1)
+    compressed += b'\x00' * (-len(compressed) % 8)
+
+    # inverse of the reader's xor chain: each block is xor-ed with the previous plain block
+    plain = numpy.frombuffer(compressed, dtype=numpy.int64)
+    chained = plain.copy()
+    chained[1:] ^= plain[:-1]
+    encrypted = Blowfish.new(BLOWFISH_KEY, Blowfish.MODE_ECB).encrypt(chained.tobytes())
+
+    engine_data = json.dumps({'clientVersionFromExe': '0,10,1,0', 'mapName': 'spaces/00_CO_ocean'}).encode()
+    return b''.join([REPLAY_SIGNATURE, struct.pack('i', 1), struct.pack('i', len(engine_data)), engine_data,
+                     b'\x00' * 8, encrypted])
+
+
+def run(replay, bulk_decrypt):
+    start = time.perf_counter()
+    data = ReplayReader(io.BytesIO(replay), bulk_decrypt=bulk_decrypt).get_data()
+    return time.perf_counter() - start, data.decrypted_data
+
+
+def run_path(path, bulk_decrypt):
+    start = time.perf_counter()
+    data = PathReplayReader(path, bulk_decrypt=bulk_decrypt).get_replay_data()
+    return time.perf_counter() - start, data.decrypted_data
+
+
+def main():
+    if len(sys.argv) > 1:
+        replays = []
+        for path in sys.argv[1:]:
+            with open(path, 'rb') as f:
+                replays.append((os.path.basename(path), f.read()))
+    else:
+        replays = [(f'synthetic {size} MB', build_replay(size * 1024 * 1024)) for size in SIZES_MB]
+
+    for name, replay in replays:
+        blockwise_time, blockwise_data = run(replay, bulk_decrypt=False)
+        bulk_time, bulk_data = run(replay, bulk_decrypt=True)
+        assert blockwise_data == bulk_data, f'{name}: bulk output differs from blockwise output'
+        print(f'{name}: blockwise {blockwise_time:.2f}s, bulk {bulk_time:.2f}s, '
+              f'{blockwise_time / bulk_time:.1f}x faster')
+        utils_data = bulk_data
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'replay.wowsreplay')
+            with open(path, 'wb') as f:
+                f.write(replay)
+            blockwise_time, blockwise_data = run_path(path, bulk_decrypt=False)
+            bulk_time, bulk_data = run_path(path, bulk_decrypt=True)
+        assert blockwise_data == bulk_data, f'{name}: replay_unpack bulk output differs from blockwise output'
+        assert bulk_data == utils_data, f'{name}: replay_unpack output differs from utils output'
+        print(f'{name} (replay_unpack): blockwise {blockwise_time:.2f}s, bulk {bulk_time:.2f}s, '
+              f'{blockwise_time / bulk_time:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
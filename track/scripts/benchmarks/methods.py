@@ -0,0 +1,63 @@
+"""
+Compares compiled method argument decoders with walking DataType trees.
+
+Usage: python methods.py [version] [iterations]
+"""
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.clients.wows.helper import get_definitions  # noqa: E402
+from replay_unpack.core.network.payload_reader import PayloadReader  # noqa: E402
+
+VERSION = '0_10_1'
+ITERATIONS = 20000
+ENTRIES = 12
+
+
+def damages_payload():
+    return struct.pack('=B', ENTRIES) + b''.join(struct.pack('=if', 1000 + i, 1500.0) for i in range(ENTRIES))
+
+
+def minimap_payload():
+    vision = b''.join(struct.pack('=iI', 1000 + i, 0x12345678) for i in range(ENTRIES))
+    return struct.pack('=B', ENTRIES) + vision + struct.pack('=B', 0)
+
+
+METHODS = [
+    ('Vehicle', 'receiveDamagesOnShip', damages_payload),
+    ('Avatar', 'updateMinimapVisionInfo', minimap_payload),
+]
+
+
+def walk(method, payload):
+    stream = PayloadReader(payload)
+    return [arg.type.create_from_stream(stream) for arg in method._arguments]
+
+
+def main():
+    version = sys.argv[1] if len(sys.argv) > 1 else VERSION
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else ITERATIONS
+    definitions = get_definitions(version)
+
+    for entity_name, method_name, build_payload in METHODS:
+        methods = definitions.get_entity_def_by_name(entity_name).client().get_exposed_index_map()
+        method = next(m for m in methods if m.get_name() == method_name)
+        payload = build_payload()
+
+        compiled, _ = method.create_from_stream(PayloadReader(payload))
+        assert compiled == walk(method, payload), f'{method_name}: compiled decoder result differs'
+
+        walk_time = min(timeit.repeat(lambda: walk(method, payload), number=iterations, repeat=3))
+        compiled_time = min(timeit.repeat(lambda: method.create_from_stream(PayloadReader(payload)),
+                                          number=iterations, repeat=3))
+        print(f'{method_name}: tree {walk_time / iterations * 1e6:.1f} us, '
+              f'compiled {compiled_time / iterations * 1e6:.1f} us, '
+              f'{walk_time / compiled_time:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
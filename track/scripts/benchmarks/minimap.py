@@ -0,0 +1,63 @@
+"""
+Compares updateMinimapVisionInfo with linear player lookup and unpacking
+entry by entry against vehicle id map and batch NumPy unpacking,
+and checks that both give the same player states.
+
+Usage: python minimap.py [version] [iterations]
+"""
+import importlib
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replaydata import PlayerStateEvents  # noqa: E402
+
+VERSION = '0_10_1'
+ITERATIONS = 2000
+PLAYERS = 24
+
+
+def update_by_entry(history, ships_minimap_diff, unpack_values, pack_pattern):
+    # previous implementation
+    for e in ships_minimap_diff:
+        x, y, yaw = unpack_values(e['packedData'], pack_pattern)
+        for slot in range(history.get_players_count()):
+            if history._identities[slot][2] == e['vehicleID']:
+                history.set_position(0, slot, x, y, yaw)
+                break
+
+
+def main():
+    version = sys.argv[1] if len(sys.argv) > 1 else VERSION
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else ITERATIONS
+    module = importlib.import_module('replay_unpack.clients.wows.versions.%s.battle_controller' % version)
+
+    controller = module.BattleController()
+    reference = PlayerStateEvents()
+    for slot in range(PLAYERS):
+        player_slot = controller._player_events.add_player(0, slot, 100 + slot, 1000 + slot)
+        controller._vehicle_slots[1000 + slot] = [player_slot]
+        reference.add_player(0, slot, 100 + slot, 1000 + slot)
+
+    rnd = random.Random(0)
+    for size in (1, 2, 4, 8, 12, PLAYERS):
+        diff = [{'vehicleID': 1000 + slot, 'packedData': rnd.getrandbits(31) if rnd.random() < 0.9 else 0}
+                for slot in rnd.sample(range(PLAYERS), size)]
+
+        by_entry = timeit.timeit(
+            lambda: update_by_entry(reference, diff, module.unpack_values, module.MINIMAP_PACK_PATTERN),
+            number=iterations)
+        batch = timeit.timeit(lambda: controller.updateMinimapVisionInfo(None, diff, []), number=iterations)
+        print(f'{size:3} ships: by entry {by_entry / iterations * 1e6:7.2f} us, '
+              f'batch {batch / iterations * 1e6:7.2f} us')
+
+        expected, actual = reference.sample([1]), controller._player_events.sample([1])
+        for name in ('x', 'y', 'yaw', 'isVisible'):
+            assert (expected.get_column(name) == actual.get_column(name)).all(), name
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares framing a replay for every pass with framing it once into a PacketIndex,
+for a replay that is played several times and filtered by packet type,
+and checks that both yield the same packets.
+
+Usage: python packet_index.py replay.wowsreplay [passes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.core.network.net_packet import iter_packets  # noqa: E402
+from replay_unpack.core.network.packet_index import PacketIndex  # noqa: E402
+from replay_unpack.replay_reader import ReplayReader  # noqa: E402
+
+PASSES = 5
+# EntityMethod, the type most analyses filter for
+METHOD_TYPE = 0x8
+
+
+def frame_every_pass(data, passes):
+    selected = 0
+    for _ in range(passes):
+        selected += sum(1 for packet in iter_packets([data]) if packet.type == METHOD_TYPE)
+    return selected
+
+
+def frame_once(data, passes):
+    index = PacketIndex(data)
+    selected = 0
+    for _ in range(passes):
+        selected += sum(1 for _ in index.iter_packets(index.select(types=[METHOD_TYPE])))
+    return selected
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    data = ReplayReader(sys.argv[1]).get_replay_data().decrypted_data
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else PASSES
+
+    expected = [(p.size, p.type, p.time, bytes(p.raw_data.read())) for p in iter_packets([data])]
+    actual = [(p.size, p.type, p.time, bytes(p.raw_data.read())) for p in PacketIndex(data)]
+    assert expected == actual, 'index yields different packets'
+
+    results = {}
+    for name, func in (('every pass', frame_every_pass), ('index', frame_once)):
+        started = time.perf_counter()
+        results[name] = func(data, passes)
+        print(f'{name:>10}: {(time.perf_counter() - started) * 1e3:7.1f} ms for {passes} passes')
+    assert results['every pass'] == results['index'], 'filtered packets differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures decoding cost of fixed-layout packet classes, one packet type at a time.
+
+Usage: python packets.py [iterations]
+Run it on two revisions to compare per-packet cost.
+"""
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.core.network.payload_reader import PayloadReader  # noqa: E402
+from replay_unpack.core.network.types import Matrix4, Vector3  # noqa: E402
+from replay_unpack.core.packets import (  # noqa: E402
+    BasePlayerCreate,
+    EntityControl,
+    EntityEnter,
+    EntityLeave,
+    EntityMethod,
+    EntityProperty,
+    NestedProperty,
+    Position,
+)
+from replay_unpack.clients.wows.network.packets import CellPlayerCreate, EntityCreate, Map  # noqa: E402
+
+ITERATIONS = 200000
+
+MAP_NAME = b'spaces/16_OC_bees_to_honey'
+STATE = b'\x00' * 32
+
+PAYLOADS = [
+    (Vector3, struct.pack('=3f', 1.0, 2.0, 3.0)),
+    (Matrix4, struct.pack('=16f', *range(16))),
+    (Position, struct.pack('=2i3f3f3fb', 1, 0, 1.0, 2.0, 3.0, 0.0, 0.0, 0.0, 0.5, 0.0, 0.0, 0)),
+    (EntityControl, struct.pack('=ib', 1, 1)),
+    (EntityEnter, struct.pack('=3i', 1, 1, 0)),
+    (EntityLeave, struct.pack('=i', 1)),
+    (EntityMethod, struct.pack('=2II', 1, 2, len(STATE)) + STATE),
+    (EntityProperty, struct.pack('=2II', 1, 2, len(STATE)) + STATE),
+    (BasePlayerCreate, struct.pack('=ihI', 1, 2, len(STATE)) + STATE),
+    (CellPlayerCreate, struct.pack('=3i3f3fI', 1, 1, 0, *[0.0] * 6, len(STATE)) + STATE),
+    (EntityCreate, struct.pack('=ihii3f3fI', 1, 2, 0, 1, *[0.0] * 6, len(STATE)) + STATE),
+    (Map, struct.pack('=iqi', 1, 2, len(MAP_NAME)) + MAP_NAME + b'\x00' * 65),
+    (NestedProperty, struct.pack('=Ibb3s', 1, 0, 4, b'\x00' * 3) + b'\x80\x00\x00\x00'),
+]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS
+
+    for packet_class, payload in PAYLOADS:
+        seconds = min(timeit.repeat(lambda: packet_class(PayloadReader(payload)), number=iterations, repeat=3))
+        print(f'{packet_class.__name__:<18} {seconds / iterations * 1e9:8.0f} ns/packet')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares deep-copied PlayerState lists with PlayerStateEvents
+sampled afterwards, for a 20 minute battle of 24 players sampled
+every 0.5 s, and checks that both read back the same states.
+
+Usage: python player_states.py
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from copy import deepcopy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replaydata import PlayerState, PlayerStateEvents  # noqa: E402
+
+PLAYERS = 24
+TICKS = 20 * 60 * 2
+# minimap updates and health changes between two ticks
+CHANGES = 30
+
+
+def generate_changes(seed=0):
+    rnd = random.Random(seed)
+    changes = []
+    for _ in range(TICKS):
+        tick = []
+        for _ in range(CHANGES):
+            slot = rnd.randrange(PLAYERS)
+            if rnd.random() < 0.8:
+                hidden = rnd.random() < 0.2
+                tick.append((slot, 'position', (-2500.0 if hidden else rnd.uniform(-2500, 2500),
+                                                -2500.0 if hidden else rnd.uniform(-2500, 2500),
+                                                rnd.uniform(-3.14, 3.14))))
+            else:
+                tick.append((slot, 'health', rnd.uniform(0, 50000)))
+        changes.append(tick)
+    return changes
+
+
+def run_objects(changes):
+    states = []
+    for slot in range(PLAYERS):
+        ps = PlayerState()
+        ps.id, ps.avatarId, ps.vehicleId, ps.isAlive = slot, slot + 100, slot + 1000, True
+        states.append(ps)
+
+    timed = {}
+    for tick, tick_changes in enumerate(changes):
+        for slot, name, value in tick_changes:
+            if name == 'position':
+                states[slot].setPosition(*value)
+            else:
+                states[slot].health = value
+        timed[tick * 0.5] = deepcopy(states)
+    return timed
+
+
+def run_events(changes):
+    events = PlayerStateEvents()
+    for slot in range(PLAYERS):
+        events.add_player(-1, slot, slot + 100, slot + 1000)
+        events.set_value(-1, slot, 'isAlive', True)
+
+    sample_times = []
+    for tick, tick_changes in enumerate(changes):
+        # sample is taken after changes of its tick
+        time = tick * 0.5
+        sample_times.append(time)
+        for slot, name, value in tick_changes:
+            if name == 'position':
+                events.set_position(time - 0.1, slot, *value)
+            else:
+                events.set_value(time - 0.1, slot, 'health', value)
+    return events.sample(sample_times)
+
+
+def main():
+    changes = generate_changes()
+    results = {}
+    for name, func in (('deepcopy', run_objects), ('events', run_events)):
+        started = time.perf_counter()
+        func(changes)
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        timed = func(changes)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = timed
+        print(f'{name:>8}: {elapsed * 1e3:7.1f} ms, {size / 1024 ** 2:6.1f} MiB kept')
+
+    for t, states in results['deepcopy'].items():
+        expected = [vars(ps) for ps in states]
+        assert expected == [vars(ps) for ps in results['events'][t]], t
+
+
+if __name__ == '__main__':
+    main()
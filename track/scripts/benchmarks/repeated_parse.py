@@ -0,0 +1,56 @@
+"""
+Parses the same replay many times in one process, like a long-running bot does,
+and checks that per-parse time stays flat and no battle controller outlives its parse.
+
+Usage: python repeated_parse.py replay.wowsreplay [runs]
+"""
+import gc
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.core import IBattleController  # noqa: E402
+from utils.classes import ReplayReader, parse_replay  # noqa: E402
+
+RUNS = 50
+WINDOW = 10
+# allowed slowdown of last parses compared to first ones
+TOLERANCE = 1.25
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1], 'rb') as f:
+        replay = f.read()
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else RUNS
+
+    version = ReplayReader(io.BytesIO(replay)).get_header().engine_data['clientVersionFromExe']
+    version = version[:version.rfind(',')].replace(',', '_')
+
+    # first parse loads definitions, it is not timed
+    parse_replay(replay, version)
+
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        parse_replay(replay, version)
+        times.append(time.perf_counter() - started)
+
+    gc.collect()
+    controllers = sum(isinstance(obj, IBattleController) for obj in gc.get_objects())
+
+    first, last = statistics.median(times[:WINDOW]), statistics.median(times[-WINDOW:])
+    print(f'{runs} parses: first {first * 1e3:.1f} ms, last {last * 1e3:.1f} ms, '
+          f'{controllers} controllers alive')
+    assert controllers == 0, 'battle controllers are kept alive after parsing'
+    assert last <= first * TOLERANCE, 'parse time grows with number of parsed replays'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Moves definition scripts of game versions into the shared content-addressed store and back.
+
+Usage:
+    python store.py pack <version dir>...      replace scripts/ with scripts.json manifest
+    python store.py unpack <version dir>...    restore scripts/ from the store, e.g. to edit or diff them
+    python store.py prune <versions dir>       remove stored files no manifest refers to
+
+New game versions can be added with plain scripts/ and packed later.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from replay_unpack.core.entity_def.scripts_store import pack_scripts, prune_store, unpack_scripts  # noqa: E402
+
+COMMANDS = {
+    'pack': pack_scripts,
+    'unpack': unpack_scripts,
+}
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in (*COMMANDS, 'prune'):
+        print(__doc__)
+        sys.exit(1)
+
+    command, paths = sys.argv[1], [os.path.abspath(path) for path in sys.argv[2:]]
+    if command == 'prune':
+        for path in paths:
+            print(f'{path}: removed {len(prune_store(path))} unused files')
+        return
+
+    for path in paths:
+        COMMANDS[command](path)
+        print(f'{command}ed {path}')
+
+
+if __name__ == '__main__':
+    main()
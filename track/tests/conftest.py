@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+TRACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TRACK_DIR)
+
+from replay_unpack.clients.wows.helper import get_definitions  # noqa: E402
+
+VERSION = '0_10_1'
+
+
+@pytest.fixture(scope='session')
+def definitions():
+    return get_definitions(VERSION)
+
+
+def iter_entity_defs(definitions):
+    index = 1
+    while True:
+        try:
+            yield definitions.get_entity_def_by_index(index)
+        except KeyError:
+            return
+        index += 1
@@ -0,0 +1,36 @@
+"""
+Every reference to an alias must resolve to the same DataType instance,
+also after definitions are pickled.
+"""
+import pickle
+
+
+def alias_properties(definitions):
+    """
+    (entity name, property name, alias key) of properties typed by an alias
+    """
+    by_id = {id(data_type): key for key, data_type in definitions._alias._mapping.items()}
+    found = []
+    for name, entity_def in definitions._entity_defs_by_name.items():
+        for prop in entity_def.properties()._internal_index:
+            if id(prop._type) in by_id:
+                found.append((name, prop.get_name(), by_id[id(prop._type)]))
+    return found
+
+
+def test_alias_resolved_once(definitions):
+    alias = definitions._alias
+    assert alias._mapping
+    for name, header_size in list(alias._mapping):
+        assert alias.get_alias_data_type(name, header_size) is alias.get_alias_data_type(name, header_size)
+
+
+def test_alias_shared_after_pickle(definitions):
+    found = alias_properties(definitions)
+    # same alias is used by several properties
+    assert len(found) > len({key for _, _, key in found})
+
+    restored = pickle.loads(pickle.dumps(definitions, protocol=pickle.HIGHEST_PROTOCOL))
+    for entity_name, prop_name, key in found:
+        prop = restored.get_entity_def_by_name(entity_name).properties()._props_by_name[prop_name]
+        assert prop._type is restored._alias._mapping[key]
@@ -0,0 +1,115 @@
+"""
+Compiled decoders and skippers must read the same values as DataType.create_from_stream,
+and fail where it fails, e.g. on truncated payloads.
+"""
+import random
+import struct
+
+import pytest
+
+from conftest import iter_entity_defs
+from replay_unpack.core.entity import CLIENT_FLAGS
+from replay_unpack.core.entity_def.data_types import get_decoder, get_skipper
+from replay_unpack.core.entity_def.data_types.compiler import _get_fixed_layout
+from replay_unpack.core.entity_def.data_types.other import Array
+from replay_unpack.core.network.payload_reader import PayloadReader
+
+PAYLOADS_PER_TYPE = 12
+PAYLOAD_SIZES = (0, 1, 2, 3, 5, 8, 16, 40, 200)
+
+
+def collect_types(definitions):
+    types = {}
+    for entity_def in iter_entity_defs(definitions):
+        for method in entity_def.client().get_exposed_index_map():
+            for argument in method._arguments:
+                types.setdefault(id(argument.type), argument.type)
+        for prop in entity_def.properties().get_properties_by_flags(CLIENT_FLAGS, exposed_index=True):
+            types.setdefault(id(prop._type), prop._type)
+    return list(types.values())
+
+
+def normalize(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, float) and value != value:
+        return 'nan'
+    return value
+
+
+def decode(func, payload):
+    """
+    Decoded value and position after it, or None if decoding failed
+    """
+    stream = PayloadReader(payload)
+    try:
+        return normalize(func(stream)), stream.tell()
+    except Exception:
+        return None
+
+
+def skip(skipper, payload):
+    stream = PayloadReader(payload)
+    try:
+        skipper(stream)
+    except struct.error:
+        return None
+    return stream.tell()
+
+
+@pytest.fixture(scope='module')
+def data_types(definitions):
+    return collect_types(definitions)
+
+
+def test_decoders_match_data_types(data_types):
+    rnd = random.Random(0)
+    for data_type in data_types:
+        for _ in range(PAYLOADS_PER_TYPE):
+            payload = bytes(rnd.getrandbits(8) for _ in range(rnd.choice(PAYLOAD_SIZES)))
+            expected = decode(data_type.create_from_stream, payload)
+            assert decode(get_decoder(data_type), payload) == expected, (data_type, payload.hex())
+
+
+def test_skippers_stop_where_decoders_stop(data_types):
+    rnd = random.Random(1)
+    for data_type in data_types:
+        for _ in range(PAYLOADS_PER_TYPE):
+            payload = bytes(rnd.getrandbits(8) for _ in range(rnd.choice(PAYLOAD_SIZES)))
+            decoded = decode(data_type.create_from_stream, payload)
+            if decoded is None:
+                continue
+            position = skip(get_skipper(data_type), payload)
+            if position is None:
+                # skippers are strict about sized values DataType reads short,
+                # that is only possible when value reaches end of payload
+                assert decoded[1] == len(payload), (data_type, payload.hex())
+            else:
+                assert position == decoded[1], (data_type, payload.hex())
+
+
+def test_truncated_fixed_arrays_fail(data_types):
+    arrays = [t for t in data_types if isinstance(t, Array) and _get_fixed_layout(t.type) is not None]
+    assert arrays
+    for data_type in arrays:
+        element_size = struct.calcsize('=' + _get_fixed_layout(data_type.type)[0])
+        if data_type.array_size is None:
+            # three elements announced, one byte of them missing
+            payload = b'\x03' + b'\x00' * (element_size * 3 - 1)
+        else:
+            payload = b'\x00' * (element_size * data_type.array_size - 1)
+
+        for func in (data_type.create_from_stream, get_decoder(data_type), get_skipper(data_type)):
+            with pytest.raises(struct.error):
+                func(PayloadReader(payload))
+
+
+def test_method_arguments_fail_on_truncated_array(definitions):
+    method = next(m for m in definitions.get_entity_def_by_name('Avatar').client().get_exposed_index_map()
+                  if m.get_name() == 'receiveExplosions')
+    with pytest.raises(struct.error):
+        method.create_from_stream(PayloadReader(b'\x03'))
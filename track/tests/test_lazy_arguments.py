@@ -0,0 +1,70 @@
+"""
+LazyArguments must give the same values as EntityMethod.create_from_stream,
+whatever order arguments are accessed in.
+"""
+import random
+
+import pytest
+
+from conftest import iter_entity_defs
+from replay_unpack.core.network.payload_reader import PayloadReader
+from test_compiler import normalize
+
+PAYLOADS_PER_METHOD = 12
+PAYLOAD_SIZES = (0, 1, 4, 9, 16, 40, 200)
+
+
+def eager_values(method, payload):
+    """
+    Arguments in declaration order, or None if decoding failed
+    """
+    try:
+        args, kwargs = method.create_from_stream(PayloadReader(payload))
+    except Exception:
+        return None
+    args = iter(args)
+    return [normalize(next(args) if argument.name is None else kwargs[argument.name])
+            for argument in method._arguments]
+
+
+@pytest.fixture(scope='module')
+def methods(definitions):
+    return [method for entity_def in iter_entity_defs(definitions)
+            for method in entity_def.client().get_exposed_index_map()
+            if method._arguments]
+
+
+def test_lazy_arguments_match_eager(methods):
+    rnd = random.Random(0)
+    checked = 0
+    for method in methods:
+        for _ in range(PAYLOADS_PER_METHOD):
+            payload = bytes(rnd.getrandbits(8) for _ in range(rnd.choice(PAYLOAD_SIZES)))
+            expected = eager_values(method, payload)
+            lazy = method.create_lazy_from_stream(PayloadReader(payload))
+            assert len(lazy) == len(method._arguments)
+
+            if expected is None:
+                with pytest.raises(Exception):
+                    for index in range(len(lazy)):
+                        lazy[index]
+                continue
+
+            checked += 1
+            # last argument first, so every argument before it is skipped
+            for index in reversed(range(len(lazy))):
+                assert normalize(lazy[index]) == expected[index], (method, payload.hex())
+            for index, argument in enumerate(method._arguments):
+                if argument.name is not None:
+                    assert normalize(lazy[argument.name]) == expected[index], (method, payload.hex())
+    assert checked
+
+
+def test_lazy_arguments_out_of_range(definitions):
+    method = next(m for m in definitions.get_entity_def_by_name('Avatar').client().get_exposed_index_map()
+                  if m._arguments)
+    lazy = method.create_lazy_from_stream(PayloadReader(b''))
+    with pytest.raises(IndexError):
+        lazy[len(method._arguments)]
+    with pytest.raises(KeyError):
+        lazy['noSuchArgument']
@@ -0,0 +1,79 @@
+"""
+Nested property updates must give the same result with and without NestedPathCache,
+and cached paths must not be reused once lengths along them changed.
+"""
+import struct
+
+import pytest
+
+from replay_unpack.core.entity import Entity
+from replay_unpack.core.network.payload_reader import PayloadReader
+from replay_unpack.core.packets import NestedPathCache, NestedProperty
+from replay_unpack.core.packets.NestedProperty import NESTED_PROPERTY_HEADER
+
+ENTITY_ID = 1
+# continue, property 7 (prerequisiteData), continue, field 2 (weather), stop, then list index;
+# index 1 of two elements takes 1 bit and index 2 of three takes 2 bits,
+# so both paths are the same two bytes
+WEATHER_PATH = bytes([0b10111110, 0b01000000])
+
+
+def nested_property(path, value):
+    payload = path + struct.pack('<I', value)
+    return NestedProperty(PayloadReader(NESTED_PROPERTY_HEADER.pack(ENTITY_ID, 0, len(payload), b'\0' * 3) + payload))
+
+
+@pytest.fixture
+def battle_logic(definitions):
+    entity = Entity(ENTITY_ID, definitions.get_entity_def_by_name('BattleLogic'))
+    prop = entity.client_properties[7]
+    assert prop.get_name() == 'prerequisiteData'
+    # no ships, no effects, weather [1, 2], no squadrons
+    entity.properties['client']['prerequisiteData'] = prop.create_from_stream(
+        PayloadReader(b'\x00\x00\x02' + struct.pack('<II', 1, 2) + b'\x00'))
+    return entity
+
+
+@pytest.fixture
+def resolved(monkeypatch):
+    calls = []
+    resolve_path = NestedProperty._resolve_path
+
+    def counting(self, entity):
+        calls.append(self.payload)
+        return resolve_path(self, entity)
+
+    monkeypatch.setattr(NestedProperty, '_resolve_path', counting)
+    return calls
+
+
+def test_path_cache_hit(battle_logic, resolved):
+    cache = NestedPathCache()
+
+    nested_property(WEATHER_PATH, 7).read_and_apply(battle_logic, cache)
+    assert len(resolved) == 1
+    assert list(cache.paths) == [('BattleLogic', False, WEATHER_PATH)]
+    assert cache.header_sizes == {('BattleLogic', False): [2]}
+
+    nested_property(WEATHER_PATH, 8).read_and_apply(battle_logic, cache)
+    assert len(resolved) == 1
+    assert battle_logic.properties['client']['prerequisiteData']['weather'] == [1, 8]
+
+
+def test_path_cache_miss_on_length_change(battle_logic, resolved):
+    cache = NestedPathCache()
+    nested_property(WEATHER_PATH, 7).read_and_apply(battle_logic, cache)
+
+    weather = battle_logic.properties['client']['prerequisiteData']['weather']
+    weather.append(3)
+    # same bytes now address index 2, cached path must not be used
+    nested_property(WEATHER_PATH, 9).read_and_apply(battle_logic, cache)
+    assert len(resolved) == 2
+    assert weather == [1, 7, 9]
+
+
+def test_without_cache(battle_logic, resolved):
+    nested_property(WEATHER_PATH, 7).read_and_apply(battle_logic)
+    nested_property(WEATHER_PATH, 8).read_and_apply(battle_logic)
+    assert len(resolved) == 2
+    assert battle_logic.properties['client']['prerequisiteData']['weather'] == [1, 8]
@@ -0,0 +1,166 @@
+"""
+Sampled player states and capture point history must read
+like the dicts of states they replaced.
+"""
+import random
+from copy import deepcopy
+
+import numpy
+
+from replaydata import CapsHistory, PlayerState, PlayerStateEvents, PlayerStateHistory
+
+IDENTITIES = [(1, 11, 101), (2, 12, 102)]
+
+
+def state_fields(state):
+    return (state.id, state.avatarId, state.vehicleId, state.x, state.y, state.yaw,
+            state.health, state.isAlive, state.isVisible, state.isAbuser)
+
+
+def test_player_state_history():
+    columns = {name: numpy.zeros((2, 2), dtype) for name, dtype in PlayerStateHistory.FIELDS}
+    columns['x'][:] = [[1.5, 0.0], [2.5, 3.5]]
+    columns['health'][:] = [[100, 0], [90, 80]]
+    columns['isAlive'][:] = [[True, False], [True, True]]
+    columns['isVisible'][:] = [[-1, -1], [1, 0]]
+    # second player joined between samples
+    history = PlayerStateHistory(IDENTITIES, [10.0, 20.0], [1, 2], columns)
+
+    assert list(history) == [10.0, 20.0]
+    assert len(history) == 2
+    assert history.get_times().tolist() == [10.0, 20.0]
+    assert history.get_column('health').tolist() == [[100, 0], [90, 80]]
+
+    assert [state_fields(s) for s in history[10.0]] == [
+        (1, 11, 101, 1.5, 0.0, 0.0, 100, True, None, False)]
+    assert [state_fields(s) for s in history[20.0]] == [
+        (1, 11, 101, 2.5, 0.0, 0.0, 90, True, True, False),
+        (2, 12, 102, 3.5, 0.0, 0.0, 80, True, False, False)]
+    assert 15.0 not in history
+
+
+def record_caps():
+    """
+    CapsHistory and copies of caps recorded at every time
+    """
+    history = CapsHistory()
+    expected = {}
+    caps = [{'id': 1, 'progress': [0.0, 0.0], 'ownerId': 0}]
+    for time in range(1, 41):
+        caps[0]['progress'] = [time / 40, 0.0]
+        if time == 15:
+            caps.append({'id': 2, 'progress': [0.0, 0.0], 'ownerId': 0})
+        if time == 25:
+            caps[0]['ownerId'] = 1
+        if time == 30:
+            caps.pop()
+        # same value as before is not a change
+        caps[0]['id'] = 1
+        history.record(float(time), caps)
+        expected[float(time)] = deepcopy(caps)
+    return history, expected
+
+
+def test_caps_history():
+    history, expected = record_caps()
+    assert list(history) == list(expected)
+    assert {time: history[time] for time in history} == expected
+    # returned caps are copies
+    history[20.0][0]['ownerId'] = 5
+    assert history[20.0] == expected[20.0]
+
+
+def test_caps_cursor_seek_backwards():
+    history, expected = record_caps()
+    cursor = history.cursor()
+    assert cursor.seek(0.5) == []
+    assert cursor.seek(40.0) == expected[40.0]
+    # between samples gives last sample before
+    assert cursor.seek(24.5) == expected[24.0]
+    assert cursor.seek(16.0) == expected[16.0]
+    assert cursor.seek(0.0) == []
+    assert cursor.seek(2.0) == expected[2.0]
+
+    times = [time + offset for time in expected for offset in (0.0, 0.5)]
+    random.Random(0).shuffle(times)
+    for time in times:
+        assert cursor.seek(time) == expected[float(int(time))], time
+
+
+def test_player_state_events_sample():
+    events = PlayerStateEvents()
+    first = events.add_player(0.0, *IDENTITIES[0])
+    events.set_value(1.0, first, 'health', 100)
+    events.set_value(1.0, first, 'isAlive', True)
+    events.set_position(1.0, first, 10.0, 20.0, 0.5)
+    # same time, last one wins
+    events.set_value(2.0, first, 'health', 90)
+    events.set_value(2.0, first, 'health', 80)
+    # hidden ship keeps last position
+    events.set_position(3.0, first, -2500.0, -2500.0, 0.0)
+    # second player joins mid-battle
+    second = events.add_player(2.0, *IDENTITIES[1])
+    events.set_positions(3.0, numpy.array([second, second]), numpy.array([1.0, 2.0]),
+                         numpy.array([1.0, 2.0]), numpy.array([0.0, 0.0]))
+
+    history = events.sample([0.0, 1.0, 2.0, 2.5, 3.5])
+    # states are taken before events of sample time, adding player is one of them
+    assert history[0.0] == []
+    assert [state_fields(s) for s in history[1.0]] == [
+        (1, 11, 101, 0.0, 0.0, 0.0, 0, False, None, False)]
+    assert [state_fields(s) for s in history[2.0]] == [
+        (1, 11, 101, 10.0, 20.0, 0.5, 100, True, True, False)]
+    assert [state_fields(s) for s in history[2.5]] == [
+        (1, 11, 101, 10.0, 20.0, 0.5, 80, True, True, False),
+        (2, 12, 102, 0.0, 0.0, 0.0, 0, False, None, False)]
+    assert [state_fields(s) for s in history[3.5]] == [
+        (1, 11, 101, 10.0, 20.0, 0.5, 80, True, False, False),
+        (2, 12, 102, 2.0, 2.0, 0.0, 0, False, True, False)]
+    assert history.get_column('isVisible')[:, second].tolist() == [-1, -1, -1, -1, 1]
+
+
+def test_player_state_events_match_player_states():
+    """
+    Sampled states must equal PlayerState objects updated
+    event by event and copied at every sample time
+    """
+    rnd = random.Random(0)
+    events = PlayerStateEvents()
+    log = []
+    for time in range(200):
+        time = float(time // 3)
+        if rnd.random() < 0.05 or not events.get_players_count():
+            identity = (len(log), rnd.randrange(100), rnd.randrange(100))
+            events.add_player(time, *identity)
+            log.append((time, 'add', identity))
+        slot = rnd.randrange(events.get_players_count())
+        if rnd.random() < 0.5:
+            x, y = rnd.choice([(-2500.0, -2500.0), (rnd.random(), rnd.random())])
+            yaw = rnd.random()
+            events.set_position(time, slot, x, y, yaw)
+            log.append((time, slot, (x, y, yaw)))
+        else:
+            name, value = rnd.choice([('health', rnd.randrange(3)), ('isAlive', rnd.random() < 0.5),
+                                      ('isAbuser', rnd.random() < 0.5)])
+            events.set_value(time, slot, name, value)
+            log.append((time, slot, (name, value)))
+
+    times = [t / 2 for t in range(-1, 140)]
+    history = events.sample(times)
+
+    states = []
+    log = iter(log)
+    item = next(log, None)
+    for time in times:
+        while item is not None and item[0] < time:
+            _, slot, change = item
+            if slot == 'add':
+                ps = PlayerState()
+                ps.id, ps.avatarId, ps.vehicleId = change
+                states.append(ps)
+            elif isinstance(change[0], str):
+                setattr(states[slot], *change)
+            else:
+                states[slot].setPosition(*change)
+            item = next(log, None)
+        assert [state_fields(s) for s in history[time]] == [state_fields(s) for s in states], time
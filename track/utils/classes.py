@@ -1,15 +1,29 @@
 from discord.ext import commands
 from Crypto.Cipher import Blowfish
+import numpy
 
 import struct
 import json
 import zlib
-from typing import NamedTuple
+from typing import NamedTuple, Iterator
 import io
+import hashlib
+import pickle
+import sqlite3
+import time
+import asyncio
+from contextlib import closing, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from replay_unpack.clients.wows import ReplayPlayer
+from replay_unpack.core.network.net_packet import NetPacket, iter_packets
 
 REPLAY_SIGNATURE = b'\x12\x32\x34\x11'
 BLOWFISH_KEY = b''.join([b'\x29', b'\xB7', b'\xC9', b'\x09', b'\x38', b'\x3F', b'\x84', b'\x88',
                          b'\xFA', b'\x98', b'\xEC', b'\x4E', b'\x13', b'\x19', b'\x79', b'\xFB'])
+STREAM_CHUNK_SIZE = 1024 * 1024  # must be a multiple of the 8 byte Blowfish block
+SUMMARY_VERSION = 3  # bump when summarize_replay output changes, cached summaries are keyed by it
 
 
 class SilentError(commands.CommandError):
@@ -18,6 +32,7 @@ class SilentError(commands.CommandError):
 
 class CustomError(commands.CommandError):
     def __init__(self, message):
+        super().__init__(message)  # keeps it picklable across ReplayWorker processes
         self.message = message
 
 
@@ -25,16 +40,57 @@ ReplayInfo = NamedTuple('ReplayInfo', [('engine_data', dict),
                                        ('extra_data', list),
                                        ('decrypted_data', bytes)])
 
+ReplayHeader = NamedTuple('ReplayHeader', [('engine_data', dict),
+                                           ('extra_data', list)])
+
+ReplayStream = NamedTuple('ReplayStream', [('engine_data', dict),
+                                           ('extra_data', list),
+                                           ('packets', Iterator[NetPacket])])
+
 
 class ReplayReader:
     """
     Adapted to use BytesIO buffer.
+
+    With bulk_decrypt the whole payload goes through Blowfish in one call and
+    the block chain is undone with a cumulative XOR, instead of block by block.
     """
 
-    def __init__(self, file):
+    def __init__(self, file, bulk_decrypt=True):
         self.file = file
+        self.bulk_decrypt = bulk_decrypt
+        self.header = None
+
+    def get_header(self):
+        """
+        Parses only the signature and the JSON blocks, leaving the encrypted payload unread.
+        Cheap enough to validate version, map and players before any decryption.
+        """
+        if self.header is None:
+            engine_data, extra_data = self.__read_blocks()
+            self.header = ReplayHeader(engine_data=engine_data, extra_data=extra_data)
+        return self.header
 
     def get_data(self):
+        header = self.get_header()
+        decrypted_data = zlib.decompress(self.__decrypt_data(self.file.read()))
+
+        return ReplayInfo(engine_data=header.engine_data,
+                          extra_data=header.extra_data,
+                          decrypted_data=decrypted_data)
+
+    def get_stream(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Same as get_data, but packets are decrypted, decompressed and framed lazily,
+        chunk_size bytes of the file at a time, so the whole replay is never in memory.
+        """
+        header = self.get_header()
+
+        return ReplayStream(engine_data=header.engine_data,
+                            extra_data=header.extra_data,
+                            packets=iter_packets(self.__iter_decompressed(chunk_size)))
+
+    def __read_blocks(self):
         if self.file.read(4) != REPLAY_SIGNATURE:
             raise CustomError('File is not a valid replay.')
 
@@ -49,11 +105,35 @@ class ReplayReader:
             data = json.loads(self.file.read(block_size))
             extra_data.append(data)
 
-        decrypted_data = zlib.decompress(self.__decrypt_data(self.file.read()))
+        return engine_data, extra_data
 
-        return ReplayInfo(engine_data=engine_data,
-                          extra_data=extra_data,
-                          decrypted_data=decrypted_data)
+    def __iter_decompressed(self, chunk_size):
+        blowfish = Blowfish.new(BLOWFISH_KEY, Blowfish.MODE_ECB)
+        decompressor = zlib.decompressobj()
+        previous_block = 0
+
+        self.file.read(8)  # first block is skipped, see __decrypt_data_blockwise
+        while True:
+            chunk = self.file.read(chunk_size)
+            if not chunk:
+                break
+
+            blocks = numpy.bitwise_xor.accumulate(
+                numpy.frombuffer(blowfish.decrypt(chunk), dtype=numpy.int64))
+            # carry the xor chain over from the previous chunk
+            blocks ^= previous_block
+            previous_block = blocks[-1]
+
+            data = blocks.tobytes()
+            while data:
+                decompressed = decompressor.decompress(data, chunk_size)
+                if decompressed:
+                    yield decompressed
+                data = decompressor.unconsumed_tail
+
+        decompressed = decompressor.flush()
+        if decompressed:
+            yield decompressed
 
     @staticmethod
     def __chunkify_string(string, length=8):
@@ -61,6 +141,20 @@ class ReplayReader:
             yield i, string[0 + i:length + i]
 
     def __decrypt_data(self, dirty_data):
+        if self.bulk_decrypt:
+            return self.__decrypt_data_bulk(dirty_data)
+        return self.__decrypt_data_blockwise(dirty_data)
+
+    @staticmethod
+    def __decrypt_data_bulk(dirty_data):
+        blowfish = Blowfish.new(BLOWFISH_KEY, Blowfish.MODE_ECB)
+        # first block is skipped, same as the blockwise version
+        blocks = numpy.frombuffer(blowfish.decrypt(dirty_data[8:]), dtype=numpy.int64)
+        # every block is xor-ed with the previous plain block, so plain block n
+        # is the xor of all decrypted blocks up to n; xor with a zero block is a no-op
+        return numpy.bitwise_xor.accumulate(blocks).tobytes()
+
+    def __decrypt_data_blockwise(self, dirty_data):
         previous_block = None  # type: str
         blowfish = Blowfish.new(BLOWFISH_KEY, Blowfish.MODE_ECB)
         decrypted_data = io.BytesIO()
@@ -78,3 +172,146 @@ class ReplayReader:
 
         return decrypted_data.getvalue()
 
+
+
+class ReplayCache:
+    """
+    Disk-backed cache of parsed replays, keyed by a hash of the replay file.
+    Values are pickled and compressed, and the least recently used ones are
+    evicted once the total size goes over max_size bytes.
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS replays (hash TEXT PRIMARY KEY,
+                                                                data BLOB,
+                                                                size INTEGER,
+                                                                accessed REAL)''')
+
+    @contextmanager
+    def _connect(self):
+        # connection used as context manager only commits or rolls back, closing it is up to us
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            yield conn
+
+    @staticmethod
+    def key(replay):
+        # summaries of older format are never hit and get evicted
+        return '%s:%s' % (SUMMARY_VERSION, hashlib.sha256(replay).hexdigest())
+
+    def lookup(self, replay):
+        """
+        Key of replay and its cached value or None, hashing a whole
+        replay is blocking too, so both are meant for an executor
+        """
+        key = self.key(replay)
+        return key, self.get(key)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT data FROM replays WHERE hash = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE replays SET accessed = ? WHERE hash = ?', (time.time(), key))
+
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, key, value):
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if len(data) > self.max_size:
+            return
+
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO replays VALUES (?, ?, ?, ?)', (key, data, len(data), time.time()))
+
+            total, = conn.execute('SELECT TOTAL(size) FROM replays').fetchone()
+            for old_key, size in conn.execute('SELECT hash, size FROM replays ORDER BY accessed').fetchall():
+                if total <= self.max_size:
+                    break
+                conn.execute('DELETE FROM replays WHERE hash = ?', (old_key,))
+                total -= size
+
+
+def summarize_replay(info):
+    """
+    Keeps only what the timelapse needs from BattleController.get_info.
+    Player state changes are kept instead of sampled states,
+    so that the timelapse picks its own frame times.
+    """
+    return dict(playerInfo=info['playerInfo'],
+                owner_team_id=info['owner_team_id'],
+                player_events=info['player_events'],
+                caps_history=info['caps_history'])
+
+
+def parse_replay(replay, version):
+    """
+    Runs in a ReplayWorker process, only the picklable summary is sent back.
+    """
+    with ReplayPlayer(version) as replay_player:
+        replay_player.play(ReplayReader(io.BytesIO(replay)).get_stream().packets)
+        return summarize_replay(replay_player.get_info())
+
+
+class ReplayWorker:
+    """
+    Parses replays in a shared process pool, so that CPU-bound parsing never holds the bot's GIL.
+    At most max_workers replays are parsed at once and up to max_queued more wait for a slot.
+    A job that takes longer than timeout seconds is abandoned, but keeps its slot until its process is done.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, timeout=180):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.max_workers = max_workers
+        # created on first parse, before Python 3.10 it binds to the loop current at creation
+        self.slots = None
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.queued = 0
+
+    async def parse(self, replay, version):
+        if self.queued >= self.max_queued:
+            raise CustomError('Too many replays are being processed right now, please try again later.')
+
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_workers)
+
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+
+        executor = self.executor
+        try:
+            future = asyncio.get_event_loop().run_in_executor(executor, parse_replay, replay, version)
+        except BrokenProcessPool:
+            # a worker died earlier, e.g. killed for memory, pool refuses new jobs until replaced
+            self.slots.release()
+            self._replace_executor(executor)
+            raise CustomError('Replay parser was restarted, please try again.')
+        except BaseException:
+            # e.g. RuntimeError after shutdown
+            self.slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise CustomError('Replay took too long to process.')
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            raise CustomError('Replay parser crashed, please try again.')
+
+    def _replace_executor(self, broken):
+        # concurrent jobs of same pool fail together, only first of them replaces it
+        if self.executor is broken:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            broken.shutdown(wait=False)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)